@@ -4,8 +4,10 @@ import tempfile
 from pathlib import Path
 from typing import Any, AsyncGenerator, Dict
 
+import pytest
 import pytest_asyncio
 from aiocache import caches
+from anyio import Path as AsyncPath
 from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
 from tortoise import Tortoise
@@ -17,8 +19,19 @@ os.environ["GOOSEBIT_RAUC_COMPATIBLE_PATTERN"] = r"^(?P<hw_boardname>.+?)(-(?P<h
 
 from goosebit import app  # noqa: E402
 from goosebit.auth.permissions import GOOSEBIT_PERMISSIONS  # noqa: E402
+from goosebit.cache import local_cache  # noqa: E402
 from goosebit.db.models import UpdateModeEnum, UpdateStateEnum  # noqa: E402
+from goosebit.device_manager import (  # noqa: E402
+    DeviceManager,
+    device_logs,
+    heartbeats,
+    resolved_updates,
+)
 from goosebit.settings import PWD_CXT  # type: ignore[attr-defined]  # noqa: E402
+from goosebit.storage import storage  # noqa: E402
+from goosebit.storage.cache import artifact_cache  # noqa: E402
+from goosebit.storage.filesystem import FilesystemStorageBackend  # noqa: E402
+from goosebit.updater.controller.v1.payloads import chunk_templates  # noqa: E402
 
 # Configure logging
 logging.basicConfig(level=logging.WARN)
@@ -33,9 +46,27 @@ TORTOISE_CONF = {
 }
 
 
+@pytest.fixture(scope="function", autouse=True)
+def artifacts_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    # keep uploaded and cached artifacts out of the repository
+    artifacts_dir = tmp_path.joinpath("artifacts")
+    if isinstance(storage.backend, FilesystemStorageBackend):
+        monkeypatch.setattr(storage.backend, "base_path", AsyncPath(artifacts_dir))
+    monkeypatch.setattr(artifact_cache, "directory", AsyncPath(artifacts_dir).joinpath(".cache"))
+    artifact_cache.clear()
+    return artifacts_dir
+
+
 @pytest_asyncio.fixture(scope="function", autouse=True)
 async def clear_cache() -> AsyncGenerator[None, None]:
     await caches.get("default").clear()
+    local_cache.clear()
+    heartbeats.clear()
+    resolved_updates.clear()
+    chunk_templates.clear()
+    device_logs.clear()
+    # database ids are not stable across tests
+    DeviceManager._hardware_default = None
     yield
 
 
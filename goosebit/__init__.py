@@ -1,7 +1,7 @@
 import importlib.metadata
 from contextlib import asynccontextmanager
 from logging import getLogger
-from typing import Annotated, AsyncGenerator, Awaitable, Callable
+from typing import Annotated, AsyncGenerator
 
 from fastapi import Depends, FastAPI, HTTPException
 from fastapi.exception_handlers import http_exception_handler
@@ -14,18 +14,23 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from tortoise.exceptions import ValidationError
 
 from goosebit import api, db, plugins, ui, updater
-from goosebit.auth import (
-    get_user_from_request,
-    login_user,
-    permissions,
-    redirect_if_authenticated,
+from goosebit.auth import login_user, permissions, redirect_if_authenticated
+from goosebit.device_manager import (
+    DeviceManager,
+    heartbeats,
+    running_updates,
+    warm_up_caches,
 )
-from goosebit.device_manager import DeviceManager
-from goosebit.settings import PWD_CXT, config  # type: ignore[attr-defined]
-from goosebit.ui.nav import nav
+from goosebit.middleware import RequestContextMiddleware
+from goosebit.settings import config
+from goosebit.storage import storage
+from goosebit.ui.nav import nav  # noqa: F401, used by plugins
 from goosebit.ui.static import static
 from goosebit.ui.templates import templates
+from goosebit.updater.external_auth import external_tokens
+from goosebit.updater.polling import poll_time_policy
 from goosebit.users import create_initial_user
+from goosebit.util.passwords import password_hasher
 
 logger = getLogger(__name__)
 
@@ -39,7 +44,21 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
     logger.debug(f"Initialized storage backend: {config.storage.backend}")
 
     if db_ready:
+        heartbeats.start()
+        await running_updates.reconcile()
+        running_updates.start()
+        if config.cache.warmup.enable:
+            # requests are only accepted once startup completed
+            await warm_up_caches()
+        poll_time_policy.load.start()
         yield
+        await poll_time_policy.load.stop()
+        await running_updates.stop()
+        # write pending device connection updates before shutting down
+        await heartbeats.stop()
+        await external_tokens.close()
+        password_hasher.shutdown()
+        storage.close()
     await db.close()
 
 
@@ -95,6 +114,8 @@ for plugin in plugins.load():
     if plugin.permissions is not None:
         permissions.HANDLER.append(plugin.permissions)
 
+app.add_middleware(RequestContextMiddleware)
+
 
 # Custom exception handler for Tortoise ValidationError
 @app.exception_handler(ValidationError)
@@ -109,24 +130,6 @@ async def custom_http_exception_handler(request: Request, exc: StarletteHTTPExce
     return await http_exception_handler(request, exc)
 
 
-@app.middleware("http")
-async def attach_user(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-    request.scope["user"] = await get_user_from_request(request)
-    return await call_next(request)
-
-
-@app.middleware("http")
-async def attach_nav(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-    request.scope["nav"] = nav.get()
-    return await call_next(request)
-
-
-@app.middleware("http")
-async def attach_config(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-    request.scope["config"] = config
-    return await call_next(request)
-
-
 @app.get("/", include_in_schema=False)
 def root_redirect(request: Request) -> RedirectResponse:
     return RedirectResponse(request.url_for("ui_root"))
@@ -149,7 +152,7 @@ async def setup_get(request: Request) -> Response:
 
 @app.post("/setup", include_in_schema=False)
 async def setup_post(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> dict[str, str]:
-    await create_initial_user(form_data.username, PWD_CXT.hash(form_data.password))
+    await create_initial_user(form_data.username, await password_hasher.hash(form_data.password))
     return {"access_token": await login_user(form_data.username, form_data.password), "token_type": "bearer"}
 
 
@@ -28,3 +28,62 @@ users_count = meter.create_gauge(
     "users.count",
     description="The number of registered users",
 )
+
+running_updates_count = meter.create_gauge(
+    "updates.running.count",
+    description="The number of devices with a running update",
+)
+
+poll_time_factor = meter.create_gauge(
+    "polling.load_factor",
+    description="The factor the poll time of devices is stretched by due to server load",
+)
+
+cache_fills_coalesced = meter.create_counter(
+    "cache.fills.coalesced",
+    description="The number of cache misses that waited for a concurrent fill of the same entry",
+)
+
+cache_warmup_duration = meter.create_histogram(
+    "cache.warmup.duration",
+    unit="s",
+    description="The time loading devices, rollouts and software into the caches on startup took",
+)
+
+artifact_transfer_bytes = meter.create_histogram(
+    "storage.transfer.bytes",
+    unit="By",
+    description="The number of bytes of an artifact streamed to a client",
+)
+
+artifact_transfer_duration = meter.create_histogram(
+    "storage.transfer.duration",
+    unit="s",
+    description="The time streaming an artifact to a client took",
+)
+
+device_lookups = meter.create_histogram(
+    "ddi.device.lookups",
+    description="The number of device lookups of a DDI request",
+)
+
+password_hashing_duration = meter.create_histogram(
+    "auth.password_hashing.duration",
+    unit="s",
+    description="The time password operations took, including waiting for a worker",
+)
+
+password_hashing_queue = meter.create_gauge(
+    "auth.password_hashing.queue",
+    description="The number of password operations running or waiting for a worker",
+)
+
+password_hashing_rejected = meter.create_counter(
+    "auth.password_hashing.rejected",
+    description="The number of password operations rejected due to a full queue",
+)
+
+artifact_streams_coalesced = meter.create_counter(
+    "storage.transfer.coalesced",
+    description="The number of artifact streams that tailed a concurrent download of the same artifact",
+)
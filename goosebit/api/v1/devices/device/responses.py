@@ -6,3 +6,4 @@ from pydantic import BaseModel
 class DeviceLogResponse(BaseModel):
     log: str | None
     progress: int | None
+    next: int | None = None  # cursor to read further log segments with
@@ -7,7 +7,7 @@ from goosebit.api.v1.devices.device.responses import DeviceLogResponse
 from goosebit.auth import validate_user_permissions
 from goosebit.auth.permissions import GOOSEBIT_PERMISSIONS
 from goosebit.db import Device  # type: ignore[attr-defined]
-from goosebit.device_manager import get_device
+from goosebit.device_manager import DeviceManager, get_device
 from goosebit.schema.devices import DeviceSchema
 
 router = APIRouter(prefix="/{dev_id}")
@@ -28,7 +28,10 @@ async def device_get(_: Request, device: Device = Depends(get_device)) -> Device
     "/log",
     dependencies=[Security(validate_user_permissions, scopes=[GOOSEBIT_PERMISSIONS["device"]["read"]()])],
 )
-async def device_logs(_: Request, device: Device = Depends(get_device)) -> DeviceLogResponse:
+async def device_logs(
+    _: Request, after: int | None = None, limit: int | None = None, device: Device = Depends(get_device)
+) -> DeviceLogResponse:
     if device is None:
         raise HTTPException(404)
-    return DeviceLogResponse(log=device.last_log, progress=device.progress)
+    log, cursor = await DeviceManager.get_log(device, after, limit)
+    return DeviceLogResponse(log=log, progress=device.progress, next=cursor)
@@ -10,7 +10,7 @@ from goosebit.api.responses import StatusResponse
 from goosebit.auth import validate_user_permissions
 from goosebit.auth.permissions import GOOSEBIT_PERMISSIONS
 from goosebit.db.models import Device, Software, UpdateModeEnum
-from goosebit.device_manager import DeviceManager, get_device
+from goosebit.device_manager import DeviceManager, get_device, heartbeats
 from goosebit.schema.devices import DeviceSchema
 from goosebit.schema.software import SoftwareSchema
 
@@ -27,6 +27,8 @@ router = APIRouter(prefix="/devices", tags=["devices"])
 )
 async def devices_get(_: Request) -> DevicesResponse:
     devices = await Device.all().prefetch_related("hardware", "assigned_software", "assigned_software__compatibility")
+    for d in devices:
+        heartbeats.apply(d)
     response = DevicesResponse(devices=devices)
 
     async def set_assigned_sw(d: DeviceSchema) -> DeviceSchema:
@@ -5,6 +5,7 @@ from goosebit.api.responses import StatusResponse
 from goosebit.auth import validate_user_permissions
 from goosebit.auth.permissions import GOOSEBIT_PERMISSIONS
 from goosebit.db.models import Rollout, Software
+from goosebit.device_manager import rollout_index
 
 from .requests import RolloutsDeleteRequest, RolloutsPatchRequest, RolloutsPutRequest
 from .responses import RolloutsPutResponse, RolloutsResponse
@@ -34,6 +35,7 @@ async def rollouts_put(_: Request, rollout: RolloutsPutRequest) -> RolloutsPutRe
         feed=rollout.feed,
         software_id=rollout.software_id,
     )
+    await rollout_index.invalidate()
     return RolloutsPutResponse(success=True, id=created_rollout.id)
 
 
@@ -43,6 +45,7 @@ async def rollouts_put(_: Request, rollout: RolloutsPutRequest) -> RolloutsPutRe
 )
 async def rollouts_patch(_: Request, rollouts: RolloutsPatchRequest) -> StatusResponse:
     await Rollout.filter(id__in=rollouts.ids).update(paused=rollouts.paused)
+    await rollout_index.invalidate()
     return StatusResponse(success=True)
 
 
@@ -52,4 +55,5 @@ async def rollouts_patch(_: Request, rollouts: RolloutsPatchRequest) -> StatusRe
 )
 async def rollouts_delete(_: Request, rollouts: RolloutsDeleteRequest) -> StatusResponse:
     await Rollout.filter(id__in=rollouts.ids).delete()
+    await rollout_index.invalidate()
     return StatusResponse(success=True)
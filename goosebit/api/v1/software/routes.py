@@ -11,6 +11,7 @@ from goosebit.api.responses import StatusResponse
 from goosebit.auth import validate_user_permissions
 from goosebit.auth.permissions import GOOSEBIT_PERMISSIONS
 from goosebit.db.models import Rollout, Software
+from goosebit.device_manager import DeviceManager
 from goosebit.schema.software import SoftwareSchema
 from goosebit.storage import storage
 from goosebit.updates import create_software_update
@@ -55,6 +56,8 @@ async def software_delete(_: Request, delete_req: SoftwareDeleteRequest) -> Stat
 
         await software.delete()
         success = True
+    if success:
+        await DeviceManager.notify_software_changed()
     return StatusResponse(success=success)
 
 
@@ -70,6 +73,7 @@ async def put_update(_: Request, file: UploadFile | None = File(None), url: str
             rollout_count = await Rollout.filter(software=software).count()
             if rollout_count == 0:
                 await software.delete()
+                await DeviceManager.notify_software_changed()
             else:
                 raise HTTPException(409, "Software with same URL already exists and is referenced by rollout")
 
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Annotated, Iterable
 
-from argon2.exceptions import VerifyMismatchError
 from fastapi import Depends, HTTPException
 from fastapi.requests import HTTPConnection, Request
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from joserfc import jwt
-from joserfc.errors import BadSignatureError
+from joserfc.errors import JoseError
 
 from goosebit.db.models import User
-from goosebit.settings import PWD_CXT, config  # type: ignore[attr-defined]
+from goosebit.settings import config
 from goosebit.users import UserManager
+from goosebit.util.passwords import password_hasher
 
 logger = logging.getLogger(__name__)
 
@@ -32,14 +35,42 @@ def create_token(username: str) -> str:
     return jwt.encode(header={"alg": "HS256"}, claims={"username": username}, key=config.secret_key)
 
 
+class VerifiedTokens:
+    """
+    Usernames of tokens with a verified signature, keyed by token digest. Tokens carry no expiry and the secret key
+    is fixed while running, so a verified token stays valid.
+    """
+
+    def __init__(self) -> None:
+        self._usernames: OrderedDict[bytes, str] = OrderedDict()
+
+    def get_username(self, token: str) -> str:
+        digest = hashlib.sha256(token.encode()).digest()
+        username = self._usernames.get(digest)
+        if username is not None:
+            self._usernames.move_to_end(digest)
+            return username
+
+        username = str(jwt.decode(token, config.secret_key).claims["username"])
+        self._usernames[digest] = username
+        while len(self._usernames) > config.cache.verified_tokens_size:
+            self._usernames.popitem(last=False)
+        return username
+
+    def clear(self) -> None:
+        self._usernames.clear()
+
+
+verified_tokens = VerifiedTokens()
+
+
 async def get_user_from_token(token: str | None) -> User | None:
     if token is None:
         return None
     try:
-        token_data = jwt.decode(token, config.secret_key)
-        username = token_data.claims["username"]
+        username = verified_tokens.get_username(token)
         return await UserManager.get_user(username)
-    except (BadSignatureError, LookupError, ValueError):
+    except (JoseError, LookupError, ValueError):
         return None
 
 
@@ -57,9 +88,7 @@ async def login_user(username: str, password: str) -> str:
             detail="User has been disabled, please contact your administrator",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    try:
-        PWD_CXT.verify(user.hashed_pwd, password)
-    except VerifyMismatchError:
+    if not await password_hasher.verify(user.hashed_pwd, password):
         raise HTTPException(
             status_code=401,
             detail="Invalid username or password",
@@ -69,18 +98,20 @@ async def login_user(username: str, password: str) -> str:
 
 
 async def get_current_user(
+    connection: HTTPConnection,
     session_token: Annotated[str | None, Depends(session_auth)] = None,
     oauth2_token: Annotated[str | None, Depends(oauth2_auth)] = None,
 ) -> User | None:
-    session_user = await get_user_from_token(session_token)
-    oauth2_user = await get_user_from_token(oauth2_token)
-    user = session_user or oauth2_user
+    # resolved on first use, then shared by all dependencies of the request
+    if "user" in connection.scope:
+        return connection.scope["user"]  # type: ignore[no-any-return]
+    user = await get_user_from_token(session_token) or await get_user_from_token(oauth2_token)
+    connection.scope["user"] = user
     return user
 
 
 async def get_user_from_request(request: Request) -> User | None:
-    token = await session_auth(request) or await oauth2_auth(request)
-    return await get_user_from_token(token)
+    return await get_current_user(request, await session_auth(request), await oauth2_auth(request))
 
 
 async def redirect_if_unauthenticated(
@@ -160,23 +191,64 @@ def validate_user_permissions(
 
 
 def check_permissions(scopes: Iterable[str] | None, permissions: Iterable[str]) -> bool:
-    deny_permissions = [p.lstrip("!") for p in permissions if p.startswith("!")]
-    allow_permissions = [p for p in permissions if not p.startswith("!")]
     if scopes is None:
         return True
-    for scope in scopes:
-        if any([_check_permission(scope, permission) for permission in deny_permissions]):
-            return False
-        if not any([_check_permission(scope, permission) for permission in allow_permissions]):
-            return False
-    return True
-
-
-def _check_permission(scope: str, permission: str) -> bool:
-    split_scope = scope.split(".")
-    for idx, permission in enumerate(permission.split(".")):
-        if permission == "*":
-            continue
-        if not split_scope[idx] == permission:
-            return False
-    return True
+    return compile_permissions(tuple(permissions)).check(scopes)
+
+
+class _PermissionNode:
+    def __init__(self) -> None:
+        self.children: dict[str, _PermissionNode] = {}
+        self.terminal = False
+
+    def add(self, permission: str) -> None:
+        node = self
+        for part in permission.split("."):
+            node = node.children.setdefault(part, _PermissionNode())
+        node.terminal = True
+
+    def match(self, parts: list[str], idx: int = 0) -> bool:
+        # a permission grants every scope it is a prefix of, "*" matches any single part
+        if self.terminal:
+            return True
+        wildcard = self.children.get("*")
+        if wildcard is not None and wildcard.match(parts, idx + 1):
+            return True
+        if idx < len(parts):
+            child = self.children.get(parts[idx])
+            if child is not None and child.match(parts, idx + 1):
+                return True
+        return False
+
+
+class CompiledPermissions:
+    """
+    Permissions of a user compiled into allow and deny tries, with the decision for each checked scope remembered.
+    """
+
+    def __init__(self, permissions: Iterable[str]):
+        self._allow = _PermissionNode()
+        self._deny = _PermissionNode()
+        for permission in permissions:
+            if permission.startswith("!"):
+                self._deny.add(permission.lstrip("!"))
+            else:
+                self._allow.add(permission)
+        self._decisions: dict[str, bool] = {}
+
+    def allows(self, scope: str) -> bool:
+        decision = self._decisions.get(scope)
+        if decision is None:
+            parts = scope.split(".")
+            decision = not self._deny.match(parts) and self._allow.match(parts)
+            self._decisions[scope] = decision
+        return decision
+
+    def check(self, scopes: Iterable[str]) -> bool:
+        return all(self.allows(scope) for scope in scopes)
+
+
+@lru_cache(maxsize=1024)
+def compile_permissions(permissions: tuple[str, ...]) -> CompiledPermissions:
+    # keyed by the permissions themselves, so updated permissions are compiled anew
+    return CompiledPermissions(permissions)
@@ -0,0 +1,280 @@
+import asyncio
+import pickle
+import random
+import sys
+import time
+from collections import OrderedDict
+from importlib.util import find_spec
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+from uuid import uuid4
+
+from aiocache import caches
+from tortoise.models import Model
+
+from goosebit.api.telemetry.metrics import cache_fills_coalesced
+from goosebit.settings import config
+from goosebit.settings.schema import CacheSettings, CacheType
+
+
+def create_cache_config(settings: CacheSettings) -> dict[str, Any]:
+    if settings.backend == CacheType.REDIS:
+        if find_spec("redis") is None:
+            raise RuntimeError("Redis cache backend requires the redis extra, install goosebit[redis]")
+
+        return {
+            "cache": "aiocache.RedisCache",
+            "endpoint": settings.redis.endpoint,
+            "port": settings.redis.port,
+            "db": settings.redis.db,
+            "password": settings.redis.password,
+            "namespace": settings.namespace,
+            "serializer": {"class": "aiocache.serializers.PickleSerializer"},
+            "ttl": settings.ttl,
+        }
+
+    elif settings.backend == CacheType.MEMORY:
+        return _memory_cache_config(settings)
+
+    else:
+        raise ValueError(f"Unknown cache backend type: {settings.backend}")
+
+
+def _memory_cache_config(settings: CacheSettings) -> dict[str, Any]:
+    return {
+        "cache": "aiocache.SimpleMemoryCache",
+        "serializer": {"class": "aiocache.serializers.PickleSerializer"},
+        "ttl": settings.ttl,
+    }
+
+
+def _load_int(value: Any) -> int | None:
+    return int(value) if value is not None else None
+
+
+class SharedCounter:
+    """
+    Integer counter stored in the configured cache, so that all workers see and update the same value when a
+    shared cache backend is used.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    async def get(self) -> int | None:
+        return await caches.get("default").get(self.key, loads_fn=_load_int)  # type: ignore[no-any-return]
+
+    async def set(self, value: int) -> None:
+        await caches.get("default").set(self.key, value, ttl=None, dumps_fn=str)
+
+    async def increment(self, delta: int = 1) -> int:
+        return int(await caches.get("default").increment(self.key, delta))
+
+
+class SharedGeneration:
+    """
+    Generation token stored in the configured cache. In-process indexes remember the generation they were built for
+    and rebuild once any worker has invalidated it.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    async def get(self) -> str:
+        generation = await caches.get("default").get(self.key)
+        if generation is None:
+            # unknown (cold or evicted cache), start a new generation so that every index gets rebuilt
+            return await self.bump()
+        return generation  # type: ignore[no-any-return]
+
+    async def bump(self) -> str:
+        generation = uuid4().hex
+        await caches.get("default").set(self.key, generation, ttl=None)
+        return generation
+
+
+T = TypeVar("T")
+M = TypeVar("M", bound=Model)
+
+
+def jittered_ttl() -> int:
+    """
+    Cache ttl spread by `cache.ttl_jitter`, so that entries cached together (e.g. on mass reconnect) do not expire
+    together.
+    """
+    jitter = config.cache.ttl_jitter
+    if not jitter:
+        return config.cache.ttl
+    return max(round(config.cache.ttl * (1 + random.uniform(-jitter, jitter))), 1)
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent cache fills for the same key within the worker: the first caller runs the fill, others
+    wait for its result. Waiters get a copy of the result, just like they would from the cache. If the caller running
+    the fill gets cancelled (e.g. its client disconnected), one of the waiters takes over.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._pending: dict[str, asyncio.Future[T]] = {}
+
+    async def run(self, key: str, fill: Callable[[], Awaitable[T]]) -> T:
+        pending = self._pending.get(key)
+        if pending is not None:
+            cache_fills_coalesced.add(1, {"cache": self.name})
+        while pending is not None:
+            try:
+                return pickle.loads(pickle.dumps(await asyncio.shield(pending)))  # type: ignore[no-any-return]
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not pending.cancelled() or (task is not None and task.cancelling()):
+                    raise
+                # the fill was cancelled along with its caller, not this one, retry
+                pending = self._pending.get(key)
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await fill()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark as retrieved, waiters (if any) get it raised as well
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._pending[key]
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with per entry expiry. Values are stored as they are, without serialization, and
+    the least recently used ones are evicted once `cache.max_entries` or (estimated) `cache.max_bytes` is exceeded.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[Any, float | None, int]] = OrderedDict()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires, _ = entry
+        if expires is not None and time.monotonic() >= expires:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: int | None) -> None:
+        self.delete(key)
+        size = _estimate_size(key, value)
+        self._entries[key] = (value, time.monotonic() + ttl if ttl else None, size)
+        self.size += size
+        while len(self._entries) > config.cache.max_entries or self.size > config.cache.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+def _estimate_size(key: str, value: Any) -> int:
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+local_cache = LocalCache()
+
+
+class NamespacedCache(Generic[T]):
+    """
+    Cache for one kind of value, with keys prefixed by its namespace. Uses the in-process `local_cache` with the
+    memory backend and the configured shared cache otherwise.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    @staticmethod
+    def _shared() -> bool:
+        return config.cache.backend == CacheType.REDIS
+
+    async def _get(self, key: str) -> Any:
+        if self._shared():
+            return await caches.get("default").get(f"{self.namespace}:{key}")
+        return local_cache.get(f"{self.namespace}:{key}")
+
+    async def _set(self, key: str, value: Any, ttl: int | None) -> None:
+        if self._shared():
+            await caches.get("default").set(f"{self.namespace}:{key}", value, ttl=ttl)
+        else:
+            local_cache.set(f"{self.namespace}:{key}", value, ttl)
+
+    async def get(self, key: str) -> T | None:
+        return await self._get(key)  # type: ignore[no-any-return]
+
+    async def set(self, key: str, value: T, ttl: int | None = None) -> None:
+        await self._set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        if self._shared():
+            await caches.get("default").delete(f"{self.namespace}:{key}")
+        else:
+            local_cache.delete(f"{self.namespace}:{key}")
+
+
+class ModelCache(NamespacedCache[M]):
+    """
+    Cache for model instances. Instances are stored as a compact snapshot of their database values (a tuple), and
+    every read restores a new instance from it, as if it was loaded from the database.
+    """
+
+    def __init__(self, namespace: str, model: type[M]):
+        super().__init__(namespace)
+        self.model = model
+        self._fields: tuple[tuple[str, str], ...] | None = None
+
+    @property
+    def fields(self) -> tuple[tuple[str, str], ...]:
+        # relations are only resolved once Tortoise is initialized
+        if self._fields is None:
+            self._fields = tuple(self.model._meta.fields_db_projection.items())
+        return self._fields
+
+    def dump(self, instance: M) -> tuple[Any, ...]:
+        fields_map = self.model._meta.fields_map
+        return tuple(fields_map[name].to_db_value(getattr(instance, name), instance) for name, _ in self.fields)
+
+    def load(self, snapshot: tuple[Any, ...]) -> M:
+        return self.model._init_from_db(**{column: value for (_, column), value in zip(self.fields, snapshot)})
+
+    async def get(self, key: str) -> M | None:
+        snapshot = await self._get(key)
+        if snapshot is None:
+            return None
+        return self.load(snapshot)
+
+    async def set(self, key: str, value: M, ttl: int | None = None) -> None:
+        await self._set(key, self.dump(value), ttl)
+
+
+# Configure the module-level cache, shared by device and user managers
+caches.set_config({"default": create_cache_config(config.cache)})
@@ -0,0 +1,105 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    dialect = db.schema_generator.DIALECT
+
+    if dialect == "postgres":
+        return """
+CREATE TABLE IF NOT EXISTS "device_log" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "deployment" INT NOT NULL,
+    "size" INT NOT NULL,
+    "data" TEXT NOT NULL,
+    "device_id" VARCHAR(255) NOT NULL REFERENCES "device" ("id") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idx_device_log_device__411034" ON "device_log" ("device_id", "deployment");
+INSERT INTO "device_log" ("device_id", "deployment", "size", "data")
+    SELECT "id", 0, OCTET_LENGTH("last_log"), "last_log" FROM "device" WHERE "last_log" <> '';
+ALTER TABLE "device" ADD "deployments" INT NOT NULL DEFAULT 0;
+ALTER TABLE "device" DROP COLUMN "last_log";"""
+
+    return """
+CREATE TABLE IF NOT EXISTS "device_log" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "deployment" INT NOT NULL,
+    "size" INT NOT NULL,
+    "data" TEXT NOT NULL,
+    "device_id" VARCHAR(255) NOT NULL REFERENCES "device" ("id") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idx_device_log_device__411034" ON "device_log" ("device_id", "deployment");
+INSERT INTO "device_log" ("device_id", "deployment", "size", "data")
+    SELECT "id", 0, LENGTH(CAST("last_log" AS BLOB)), "last_log" FROM "device" WHERE "last_log" <> '';
+ALTER TABLE "device" ADD "deployments" INT NOT NULL DEFAULT 0;
+ALTER TABLE "device" DROP COLUMN "last_log";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    dialect = db.schema_generator.DIALECT
+
+    # restores the log of the current deployment
+    if dialect == "postgres":
+        return """
+ALTER TABLE "device" ADD "last_log" TEXT;
+UPDATE "device" SET "last_log" = (
+    SELECT STRING_AGG("data", '' ORDER BY "id") FROM "device_log"
+    WHERE "device_log"."device_id" = "device"."id" AND "device_log"."deployment" = "device"."deployments"
+);
+ALTER TABLE "device" DROP COLUMN "deployments";
+DROP TABLE IF EXISTS "device_log";"""
+
+    return """
+ALTER TABLE "device" ADD "last_log" TEXT;
+UPDATE "device" SET "last_log" = (
+    SELECT GROUP_CONCAT("data", '') FROM (
+        SELECT "data" FROM "device_log"
+        WHERE "device_log"."device_id" = "device"."id" AND "device_log"."deployment" = "device"."deployments"
+        ORDER BY "id"
+    )
+);
+ALTER TABLE "device" DROP COLUMN "deployments";
+DROP TABLE IF EXISTS "device_log";"""
+
+
+MODELS_STATE = (
+    "eJztnFtz2jgUgP8Kw1N2JtvhktvmjSQkYUtMB8y20yTjUbAAT3yhttyUdvLfV5KvkmXX5m"
+    "oKL22QdIz1+ehI52J+VQ1Lhbrz4QZ+10aweln5VTWBQf7geo4rVTCbRe2kAYEXnQ5VozEv"
+    "DrLBCOHWMdAdeEw6nZGtzZBmmbjVdHWdNFojPFAzJ1GTa2rfXKggawLRFNq44/EZN2umCn"
+    "9AJ/g4e1XGGtRV5lY1lXw3bVfQfEbbrqfAvqUjyde9KCNLdw0zGj2bo6llhsPx3ZDWCTSh"
+    "DRBUYxMg9+fPNGjy7hU3INuF4U2qUYMKx8DVUWzCOSmMLJMQ1Ezk0Cka4IeiQ3OCpvhj4/"
+    "T03ZtNNFdvGJnCf63+9X2rf4RH/UXmYuEH4T0fye9qeH3v9CIAAe8ylG0Ek/5fAGcwfiGg"
+    "Pq6QZzAkAhqpUcmJRgTHlj2CijvDiAUkryxLh8AUw+RFOagvWHYRNc2Dteh65bhmYLzq9b"
+    "rkrg3H+abTho7M4Rw+XLX7R3VKGQ/SEG3uSDKH1nlTvkPbIfdWQEVZqYOihooKYSHLGYzf"
+    "GMHwz1Jj9JarQjbGJM2Oidqma1CgHXxnwPR2SgYsdwWOL57KuhZ9MwG2KvWk9mWl9mR2W3"
+    "J7IF9W6k/mp44ktW8wviez3+t2e0Pc3HwyW4NB5452nFTzPYwJubG/m43zswvcS++bfDjP"
+    "eCiDh1a3m7QEOnCQgnGKTGwu5uwFNoe8noF8KH2Uep8lyrzfvusM5HY/4D6UpI50R7m3+/"
+    "1eH0N/Mm87UmdwT4acbvwJzGxrYkPHEfIXG5C4yELEt2CGPWCN+sn5yUXz7CSkFrZkoUtS"
+    "U+FMt+YGJJfPD46T2py21spDzluwEAq2/ittkoqOEdstpfun0Wg2zxu15tnF6cn5+elFLW"
+    "SY7MqCedW5IzyZLS0FsDYrciKIiezksaqe5zhQTz8N1BOHAZ/I97MFMHpCOwnypJYD5Ekt"
+    "FSTpYkECF00VZL2K1ns6SVZqJ1E2GzlQNhupKEkXh9JxtIkJVcWxxugN2FARRUxSLWia+G"
+    "4Z05XtQ1j31OIQOanN7eDbh0fiduNXYbApoVpJoreWDfGYj3CeOM9zEP2I5SB2qdIp43ug"
+    "F0FrdBc2eAtjm6lrDk8XTxJ68ZFBW65Iw263KtTPFaC8j12qfLqZlyW39BiE163BdeumXa"
+    "VK+gJGr3igqqRoq25NBIf2K1/q9mMf6gCJo0xMNL1rTXaLKKVjNawYFYZXsstoGEKECIgQ"
+    "PgBzLlvk35yKKYOFCK47XJ+hkfTGFS654k/DJnqD13rkIxIt8ThZNiX8Cuc+Pl+LQ/Z+jy"
+    "fjd6KpbbmTaaw94C5UftyuJFDSZ24AE0xoG5nw+7FAkVNzRr6W/y5tpOj+uHWmjh5ZPpE7"
+    "XX0ulFXKcjTzbuy+Qmw1rbRB/zI90xR7CvnPUazQPh2jmDyI9lMc90xJgPjD9xUXUcEkLh"
+    "n+SFMyf/xqksQb27dFMOT2F5lJvgWO4tFD6wv1IY2539PtSXfB8Jhjed3tXSWCmDFjmtc1"
+    "Z4R2heya0kcZLlFUTLHk4T2q3Cgf1rxHd0Znih7clzy0Zp5/Qs9IcPyJe03pp5+4m1aesp"
+    "k/6HSz5O6Rfm6hD7OI5QsF9tzqxbcQG6/sonUccZk9R5nYQPLEL+J+5ZIhjHLCXn/8IgjH"
+    "rSKIUSBQWfpIRnwufDhjZBkzrFQvmq6huSCowYU4+cgGF76LxTZCwcQ35ApzhJqRusv3LV"
+    "23XCTa5IOuzD3ejg06bPE7tMWPbEhVGAhCEze4B2kGFENkJTmYqi/6IfijnGYUr2Cg9kx9"
+    "HiySdJRy56E9kFsPnxgf86Ylt0lPg/Evg9ajM253Cy9S+dyR7yvkY+VrT6IrdmY5iNQMMe"
+    "PkryTlQZK9lmJabwpQYzoWtAZgmGPHobp52YPbRotGF1L+3aganQHXEZHMrA+PhA6V4VxE"
+    "1B3ho62DWbmF4skJub2srRsDTXfpQaoYvYTcXtJbrKxmFdU0OciV8OSVEf3cTh3I5jHmDY"
+    "BmlX9sOQQa8hV4R3H26e5R/GEf/KOyrdLjDP/ItbUiZ0B/+J7H7H6fwM0qL9jRHO6Ga9in"
+    "wJkW0cxg/EE1Q4QLvGC57NuVfyZIzcAbpzK2bEMURsr1khp/iW0er6uDz0P6llq/Nby+rN"
+    "SrRczAoi+cLZTnCItnN5vwKE81MZtp84LQS1KIxbvLt5jXn/dJ5jCWy/0sU1ldttxPfC58"
+    "7ofNl7F5Hy6xw+d9ONdndXmfHOWtpDBX4Nb49brpHg0C669lPTgzx6t1ZjaaE/hzjjoFtu"
+    "aVmeHUDb2wAV68jKFs5jeaCW98w5ctWLvLFNXxVjd6w2DJlwh+n10fOtS+Jawsbc80s24w"
+    "Yit2lnx7UZsRlzn89FSKISbOOFbf2VuhBCMrtedGmckwQtvQHOKYCwzmv4OelJJjZMU4oE"
+    "MTdzyq2ggdV3TNQc9ry+I+Pi+RwM2gSWbOJB0TFfF88fsxW4ZALsBXxEOTzLVoOjcmtcF8"
+    "bmgoSpbO3dyBInNbakFbG01FG5Pfk7k1gWjMwQlYpb1csxNwiHquaNchS6MARH/4bgKs1/"
+    "L87Akelf4DMrXED5/gb0TCdyLTt+yYyLa265X4PGvdrre6vbz/D1DEEWw="
+)
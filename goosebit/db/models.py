@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from enum import IntEnum
-from typing import Any, Self, cast
+from typing import Any, cast
 from urllib.parse import unquote, urlparse
 from urllib.request import url2pathname
 
@@ -68,13 +68,16 @@ class Device(Model):  # type: ignore[misc]
     update_mode = fields.IntEnumField(UpdateModeEnum, default=UpdateModeEnum.ROLLOUT)
     last_state = fields.IntEnumField(UpdateStateEnum, default=UpdateStateEnum.UNKNOWN)
     progress = fields.IntField(null=True)
-    last_log = fields.TextField(null=True)
+    deployments = fields.IntField(default=0)  # number of started deployments, logs are grouped by it
     last_seen = fields.BigIntField(null=True)
     last_ip = fields.CharField(max_length=15, null=True)
     last_ipv6 = fields.CharField(max_length=40, null=True)
     auth_token = fields.CharField(max_length=32, null=True)
     tags = fields.ManyToManyField("models.Tag", related_name="devices", through="device_tags")
 
+    hardware_id: int
+    assigned_software_id: int | None
+
     async def save(self, *args: Any, **kwargs: Any) -> None:
         # ensure if using rollout that feed is set
         if self.update_mode == UpdateModeEnum.ROLLOUT:
@@ -106,6 +109,20 @@ class Device(Model):  # type: ignore[misc]
         devices_count.set(await Device.all().count())
 
 
+class DeviceLog(Model):  # type: ignore[misc]
+    id = fields.BigIntField(primary_key=True)
+    device: fields.ForeignKeyRelation[Device] = fields.ForeignKeyField(
+        "models.Device", related_name="logs", on_delete=fields.CASCADE
+    )
+    deployment = fields.IntField()
+    size = fields.IntField()  # bytes
+    data = fields.TextField()
+
+    class Meta:
+        table = "device_log"
+        indexes = (("device_id", "deployment"),)
+
+
 class Rollout(Model):  # type: ignore[misc]
     id = fields.IntField(primary_key=True)
     created_at = fields.DatetimeField(auto_now_add=True)
@@ -151,20 +168,6 @@ class Software(Model):  # type: ignore[misc]
         through="software_compatibility",
     )
 
-    @classmethod
-    async def latest(cls, device: Device) -> Self | None:
-        updates = await cls.filter(compatibility__devices__id=device.id)
-        if len(updates) == 0:
-            return None
-        return cast(
-            Self,
-            sorted(
-                updates,
-                key=lambda x: Version.parse(x.version),
-                reverse=True,
-            )[0],
-        )
-
     @property
     def path(self) -> Path:
         return Path(url2pathname(unquote(urlparse(self.uri).path)))
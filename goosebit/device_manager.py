@@ -1,15 +1,28 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from enum import StrEnum
 from typing import Any, Awaitable, Callable, Optional
 
-from aiocache import caches
 from fastapi.requests import Request
 
+from goosebit.api.telemetry.metrics import cache_warmup_duration, running_updates_count
+from goosebit.cache import (
+    ModelCache,
+    NamespacedCache,
+    SharedCounter,
+    SharedGeneration,
+    SingleFlight,
+    jittered_ttl,
+)
 from goosebit.db.models import (
     Device,
+    DeviceLog,
     Hardware,
     Rollout,
     Software,
@@ -17,16 +30,10 @@ from goosebit.db.models import (
     UpdateStateEnum,
 )
 from goosebit.schema.updates import UpdateChunk
+from goosebit.settings import config
+from goosebit.util.tasks import PeriodicTask
 
-caches.set_config(
-    {
-        "default": {
-            "cache": "aiocache.SimpleMemoryCache",
-            "serializer": {"class": "aiocache.serializers.PickleSerializer"},
-            "ttl": 600,
-        },
-    }
-)
+logger = logging.getLogger(__name__)
 
 
 class HandlingType(StrEnum):
@@ -35,6 +42,379 @@ class HandlingType(StrEnum):
     FORCED = "forced"
 
 
+@dataclass
+class Heartbeat:
+    last_seen: int
+    track_ip: bool = False
+    last_ip: str | None = None
+    last_ipv6: str | None = None
+
+
+class HeartbeatBuffer:
+    """
+    Coalesces device connection updates (last seen timestamp and IP) in memory and writes them to the database in
+    batches, instead of issuing one UPDATE per DDI request.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[str, Heartbeat] = {}
+        self._flushing: dict[str, Heartbeat] = {}
+        self._task = PeriodicTask("heartbeat-flush", self.flush, lambda: config.heartbeat.flush_interval)
+
+    def record(self, dev_id: str, heartbeat: Heartbeat) -> None:
+        self._pending[dev_id] = heartbeat
+
+    def get(self, dev_id: str) -> Heartbeat | None:
+        return self._pending.get(dev_id) or self._flushing.get(dev_id)
+
+    def apply(self, device: Device) -> None:
+        heartbeat = self.get(device.id)
+        if heartbeat is not None:
+            self._apply(device, heartbeat)
+
+    @staticmethod
+    def _apply(device: Device, heartbeat: Heartbeat) -> None:
+        device.last_seen = heartbeat.last_seen
+        if heartbeat.track_ip:
+            device.last_ip = heartbeat.last_ip
+            device.last_ipv6 = heartbeat.last_ipv6
+
+    def discard(self, dev_ids: list[str]) -> None:
+        for dev_id in dev_ids:
+            self._pending.pop(dev_id, None)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._flushing.clear()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        self._flushing, self._pending = self._pending, {}
+        try:
+            await self._write(self._flushing)
+            await self._update_cache(self._flushing)
+        except Exception:
+            # retry on next flush, unless a newer heartbeat has been recorded in the meantime
+            for dev_id, heartbeat in self._flushing.items():
+                self._pending.setdefault(dev_id, heartbeat)
+            raise
+        finally:
+            self._flushing = {}
+
+    @staticmethod
+    async def _write(heartbeats: dict[str, Heartbeat]) -> None:
+        batch_size = config.heartbeat.batch_size
+
+        with_ip = [
+            Device(id=dev_id, last_seen=hb.last_seen, last_ip=hb.last_ip, last_ipv6=hb.last_ipv6)
+            for dev_id, hb in heartbeats.items()
+            if hb.track_ip
+        ]
+        if with_ip:
+            await Device.bulk_update(with_ip, fields=["last_seen", "last_ip", "last_ipv6"], batch_size=batch_size)
+
+        without_ip = [Device(id=dev_id, last_seen=hb.last_seen) for dev_id, hb in heartbeats.items() if not hb.track_ip]
+        if without_ip:
+            await Device.bulk_update(without_ip, fields=["last_seen"], batch_size=batch_size)
+
+    @classmethod
+    async def _update_cache(cls, heartbeats: dict[str, Heartbeat]) -> None:
+        # cached devices no longer get the flushed heartbeats applied, they would show the state before the flush
+        for dev_id, heartbeat in heartbeats.items():
+            device = await device_cache.get(dev_id)
+            if device is not None:
+                cls._apply(device, heartbeat)
+                await device_cache.set(dev_id, device, ttl=jittered_ttl())
+
+    def start(self) -> None:
+        self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+        await self.flush()
+
+
+heartbeats = HeartbeatBuffer()
+
+
+class RunningUpdatesCounter:
+    """
+    Number of devices with a running update. Maintained on device state transitions instead of being counted on every
+    poll, and periodically reconciled against the database.
+    """
+
+    def __init__(self) -> None:
+        self._counter = SharedCounter("running_updates")
+        self._task = PeriodicTask(
+            "running-updates-reconcile", self.reconcile, lambda: config.running_updates_reconcile_interval
+        )
+
+    async def get(self) -> int:
+        count = await self._counter.get()
+        if count is None:
+            return await self.reconcile()
+        return max(count, 0)
+
+    async def transition(self, previous: UpdateStateEnum, state: UpdateStateEnum) -> None:
+        if previous == state:
+            return
+        if state == UpdateStateEnum.RUNNING:
+            delta = 1
+        elif previous == UpdateStateEnum.RUNNING:
+            delta = -1
+        else:
+            return
+
+        if await self._counter.get() is None:
+            # counter is not initialized (or has been evicted), the database already contains this transition
+            await self.reconcile()
+            return
+        running_updates_count.set(max(await self._counter.increment(delta), 0))
+
+    async def remove(self, count: int) -> None:
+        if count > 0 and await self._counter.get() is not None:
+            running_updates_count.set(max(await self._counter.increment(-count), 0))
+
+    async def reconcile(self) -> int:
+        count: int = await Device.filter(last_state=UpdateStateEnum.RUNNING).count()
+        await self._counter.set(count)
+        running_updates_count.set(count)
+        return count
+
+    def start(self) -> None:
+        self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+
+
+running_updates = RunningUpdatesCounter()
+
+
+class GenerationIndex:
+    """
+    In-process index that is rebuilt from the database once its generation in the configured cache has changed, so
+    that invalidating it in one worker invalidates it in all workers.
+    """
+
+    def __init__(self, key: str):
+        self._generation = SharedGeneration(key)
+        self._built_generation: str | None = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_built(self) -> None:
+        generation = await self._generation.get()
+        if generation == self._built_generation:
+            return
+        async with self._lock:
+            if generation != self._built_generation:
+                await self._build()
+                self._built_generation = generation
+
+    async def invalidate(self) -> None:
+        await self._generation.bump()
+
+    async def generation(self) -> str:
+        return await self._generation.get()
+
+    async def _build(self) -> None:
+        raise NotImplementedError
+
+
+class RolloutIndex(GenerationIndex):
+    """
+    Active rollout per hardware and feed. The answer only depends on the hardware and feed of a device, so it is
+    resolved from an index instead of joining rollouts, software and compatibility on every poll.
+    """
+
+    def __init__(self) -> None:
+        super().__init__("rollouts_generation")
+        self._rollouts: dict[tuple[int, str], Rollout] = {}
+
+    async def get(self, hardware_id: int, feed: str | None) -> Rollout | None:
+        if feed is None:
+            return None
+        await self.ensure_built()
+        return self._rollouts.get((hardware_id, feed))
+
+    async def _build(self) -> None:
+        rollouts = (
+            await Rollout.filter(paused=False)
+            .order_by("created_at", "id")
+            .prefetch_related("software", "software__compatibility")
+        )
+        # the most recent rollout of a feed takes precedence
+        index: dict[tuple[int, str], Rollout] = {}
+        for rollout in rollouts:
+            for hardware in rollout.software.compatibility:
+                index[(hardware.id, rollout.feed)] = rollout
+        self._rollouts = index
+
+
+class SoftwareIndex(GenerationIndex):
+    """
+    Compatible software per hardware, sorted by version with the newest first. Used to find the latest software
+    without querying and sorting all compatible software on every poll.
+    """
+
+    def __init__(self) -> None:
+        super().__init__("software_generation")
+        self._software: dict[int, list[Software]] = {}
+
+    async def get(self, hardware_id: int) -> list[Software]:
+        await self.ensure_built()
+        return self._software.get(hardware_id, [])
+
+    async def latest(self, hardware_id: int) -> Software | None:
+        software = await self.get(hardware_id)
+        return software[0] if software else None
+
+    async def _build(self) -> None:
+        index: dict[int, list[Software]] = {}
+        for software in await Software.all().prefetch_related("compatibility"):
+            for hardware in software.compatibility:
+                index.setdefault(hardware.id, []).append(software)
+        for compatible in index.values():
+            compatible.sort(key=lambda s: s.parsed_version, reverse=True)
+        self._software = index
+
+
+rollout_index = RolloutIndex()
+software_index = SoftwareIndex()
+
+
+class ResolvedUpdates:
+    """
+    Resolved update per device, so that a DDI cycle (poll, deployment base, download) resolves the target software
+    only once. Entries are stored with a fingerprint of everything the resolution depends on, a changed device or a
+    new rollout or software generation makes the entry stale.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[tuple[Any, ...], tuple[HandlingType, Software | None]]] = OrderedDict()
+
+    @staticmethod
+    async def fingerprint(device: Device) -> tuple[Any, ...]:
+        return (
+            device.update_mode,
+            device.feed,
+            device.hardware_id,
+            device.assigned_software_id,
+            device.sw_version,
+            device.last_state,
+            device.force_update,
+            await rollout_index.generation(),
+            await software_index.generation(),
+        )
+
+    def get(self, dev_id: str, fingerprint: tuple[Any, ...]) -> tuple[HandlingType, Software | None] | None:
+        entry = self._entries.get(dev_id)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        self._entries.move_to_end(dev_id)
+        return entry[1]
+
+    def set(self, dev_id: str, fingerprint: tuple[Any, ...], update: tuple[HandlingType, Software | None]) -> None:
+        self._entries[dev_id] = (fingerprint, update)
+        self._entries.move_to_end(dev_id)
+        while len(self._entries) > config.cache.resolved_updates_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, dev_ids: list[str]) -> None:
+        for dev_id in dev_ids:
+            self._entries.pop(dev_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+resolved_updates = ResolvedUpdates()
+
+
+class DeviceLogStore:
+    """
+    Append-only device logs, stored as one segment per feedback message and grouped by deployment. Appending never
+    touches earlier segments, retention is applied per device once enough new data was appended.
+    """
+
+    def __init__(self) -> None:
+        # bytes appended per device since its retention was last applied by this worker
+        self._appended: dict[str, int] = {}
+
+    async def append(self, device: Device, data: str) -> None:
+        encoded = data.encode()
+        max_bytes = config.device_log.max_bytes
+        if len(encoded) > max_bytes:
+            # keep the end of oversized messages, it is the most recent part
+            encoded = encoded[-max_bytes:]
+            data = encoded.decode(errors="ignore")
+
+        await DeviceLog.create(device_id=device.id, deployment=device.deployments, size=len(encoded), data=data)
+
+        appended = self._appended.get(device.id, 0) + len(encoded)
+        if appended >= max_bytes // 4:
+            await self.apply_retention(device)
+        else:
+            self._appended[device.id] = appended
+
+    async def read(
+        self, device: Device, after: int | None = None, limit: int | None = None
+    ) -> tuple[str | None, int | None]:
+        """
+        Read the log of the current deployment, optionally paginated by segments. Returns the log and the cursor to
+        continue reading after, if there are more segments.
+        """
+        query = DeviceLog.filter(device_id=device.id, deployment=device.deployments)
+        if after is not None:
+            query = query.filter(id__gt=after)
+        query = query.order_by("id")
+        if limit is not None:
+            query = query.limit(limit + 1)
+        segments = await query.values_list("id", "data")
+
+        cursor = None
+        if limit is not None and len(segments) > limit:
+            segments = segments[:limit]
+            cursor = segments[-1][0]
+
+        if not segments:
+            return None, None
+        return "".join(data for _, data in segments), cursor
+
+    async def apply_retention(self, device: Device) -> None:
+        self._appended.pop(device.id, None)
+
+        oldest_deployment = device.deployments - config.device_log.max_deployments + 1
+        await DeviceLog.filter(device_id=device.id, deployment__lt=oldest_deployment).delete()
+
+        total = 0
+        for segment_id, size in await DeviceLog.filter(device_id=device.id).order_by("-id").values_list("id", "size"):
+            total += size
+            if total > config.device_log.max_bytes:
+                await DeviceLog.filter(device_id=device.id, id__lte=segment_id).delete()
+                break
+
+    def discard(self, dev_ids: list[str]) -> None:
+        for dev_id in dev_ids:
+            self._appended.pop(dev_id, None)
+
+    def clear(self) -> None:
+        self._appended.clear()
+
+
+device_logs = DeviceLogStore()
+
+
+device_cache = ModelCache("device", Device)
+unknown_devices: NamespacedCache[bool] = NamespacedCache("unknown_device")
+
+# concurrent cache misses of the same device (e.g. on mass reconnect) share one database query
+device_fills: SingleFlight[Device] = SingleFlight("device")
+device_lookup_fills: SingleFlight[Device | None] = SingleFlight("device_lookup")
+
+
 class DeviceManager:
     _hardware_default = None
 
@@ -43,32 +423,66 @@ class DeviceManager:
 
     @staticmethod
     async def get_device(dev_id: str) -> Device:
-        cache = caches.get("default")
-        device = await cache.get(dev_id)
+        device = await device_cache.get(dev_id)
         if device:
-            return device  # type: ignore[no-any-return]
+            heartbeats.apply(device)
+            return device
+
+        return await device_fills.run(dev_id, lambda: DeviceManager._load_device(dev_id))
 
+    @staticmethod
+    async def _load_device(dev_id: str) -> Device:
         hardware = DeviceManager._hardware_default
         if hardware is None:
             hardware = (await Hardware.get_or_create(model="default", revision="default"))[0]
             DeviceManager._hardware_default = hardware
 
-        device = (await Device.get_or_create(id=dev_id, defaults={"hardware": hardware}))[0]
-        result = await cache.set(device.id, device, ttl=600)
-        assert result, "device being cached"
+        device, created = await Device.get_or_create(id=dev_id, defaults={"hardware": hardware})
+        if created:
+            await unknown_devices.delete(dev_id)
+        heartbeats.apply(device)
+        await device_cache.set(device.id, device, ttl=jittered_ttl())
 
         return device  # type: ignore[no-any-return]
 
+    @staticmethod
+    async def find_device(dev_id: str) -> Device | None:
+        """
+        Look up a device without registering it. Unknown device ids are remembered for
+        `cache.unknown_device_ttl` seconds, so that repeated requests of unregistered devices skip the database.
+        """
+        device = await device_cache.get(dev_id)
+        if device:
+            heartbeats.apply(device)
+            return device
+
+        if await unknown_devices.get(dev_id):
+            return None
+
+        return await device_lookup_fills.run(dev_id, lambda: DeviceManager._find_device(dev_id))
+
+    @staticmethod
+    async def _find_device(dev_id: str) -> Device | None:
+        device = await Device.get_or_none(id=dev_id)
+        if device is None:
+            await unknown_devices.set(dev_id, True, ttl=config.cache.unknown_device_ttl)
+            return None
+
+        heartbeats.apply(device)
+        await device_cache.set(device.id, device, ttl=jittered_ttl())
+        return device  # type: ignore[no-any-return]
+
     @staticmethod
     async def save_device(device: Device, update_fields: list[str]) -> None:
         await device.save(update_fields=update_fields)
 
         # only update cache after a successful database save
-        result = await caches.get("default").set(device.id, device, ttl=600)
-        assert result, "device being cached"
+        await device_cache.set(device.id, device, ttl=jittered_ttl())
 
     @staticmethod
     async def update_auth_token(device: Device, auth_token: str) -> None:
+        if device.auth_token == auth_token:
+            return
         device.auth_token = auth_token
         await DeviceManager.save_device(device, update_fields=["auth_token"])
 
@@ -85,26 +499,26 @@ class DeviceManager:
     @staticmethod
     async def update_hardware(device: Device, hardware: Hardware) -> None:
         device.hardware = hardware
-        await DeviceManager.save_device(device, update_fields=["hardware"])
+        await DeviceManager.save_device(device, update_fields=["hardware_id"])
 
     @staticmethod
     async def update_device_state(device: Device, state: UpdateStateEnum) -> None:
+        previous = device.last_state
         device.last_state = state
         await DeviceManager.save_device(device, update_fields=["last_state"])
+        await running_updates.transition(previous, state)
 
     @staticmethod
     async def update_last_connection(device: Device, last_seen: int, last_ip: str | None = None) -> None:
-        device.last_seen = last_seen
+        # written to the database in batches by the heartbeat buffer
         if last_ip is None:
-            await DeviceManager.save_device(device, update_fields=["last_seen"])
+            heartbeat = Heartbeat(last_seen=last_seen)
         elif ":" in last_ip:
-            device.last_ipv6 = last_ip
-            device.last_ip = None
-            await DeviceManager.save_device(device, update_fields=["last_seen", "last_ipv6", "last_ip"])
+            heartbeat = Heartbeat(last_seen=last_seen, track_ip=True, last_ipv6=last_ip)
         else:
-            device.last_ip = last_ip
-            device.last_ipv6 = None
-            await DeviceManager.save_device(device, update_fields=["last_seen", "last_ip", "last_ipv6"])
+            heartbeat = Heartbeat(last_seen=last_seen, track_ip=True, last_ip=last_ip)
+        heartbeats.record(device.id, heartbeat)
+        heartbeats.apply(device)
 
     @staticmethod
     async def update_update(device: Device, update_mode: UpdateModeEnum, software: Software | None) -> None:
@@ -162,9 +576,11 @@ class DeviceManager:
 
     @staticmethod
     async def deployment_action_start(device: Device) -> None:
-        device.last_log = ""
+        # start a new log, previous deployments are kept within the retention limits
+        device.deployments += 1
         device.progress = 0
-        await DeviceManager.save_device(device, update_fields=["last_log", "progress"])
+        await DeviceManager.save_device(device, update_fields=["deployments", "progress"])
+        await device_logs.apply_retention(device)
 
     @staticmethod
     async def deployment_action_success(device: Device) -> None:
@@ -174,16 +590,7 @@ class DeviceManager:
     @staticmethod
     async def get_rollout(device: Device) -> Rollout | None:
         if device.update_mode == UpdateModeEnum.ROLLOUT:
-            return (  # type: ignore[no-any-return]
-                await Rollout.filter(
-                    feed=device.feed,
-                    paused=False,
-                    software__compatibility__devices__id=device.id,
-                )
-                .order_by("-created_at")
-                .first()
-                .prefetch_related("software")
-            )
+            return await rollout_index.get(device.hardware_id, device.feed)
 
         return None
 
@@ -193,18 +600,23 @@ class DeviceManager:
             rollout = await DeviceManager.get_rollout(device)
             if not rollout or rollout.paused:
                 return None
-            await rollout.fetch_related("software")
             return rollout.software  # type: ignore[no-any-return]
         if device.update_mode == UpdateModeEnum.ASSIGNED:
             await device.fetch_related("assigned_software")
             return device.assigned_software  # type: ignore[no-any-return]
 
         if device.update_mode == UpdateModeEnum.LATEST:
-            return await Software.latest(device)
+            return await software_index.latest(device.hardware_id)
 
         assert device.update_mode == UpdateModeEnum.PINNED
         return None
 
+    @staticmethod
+    async def notify_software_changed() -> None:
+        # software compatibility affects both the latest software and the rollouts of a device
+        await software_index.invalidate()
+        await rollout_index.invalidate()
+
     @staticmethod
     def add_update_source(
         source: Callable[[Request, Device], Awaitable[tuple[HandlingType, UpdateChunk | None]]],
@@ -217,6 +629,17 @@ class DeviceManager:
 
     @staticmethod
     async def get_update(device: Device) -> tuple[HandlingType, Software | None]:
+        fingerprint = await ResolvedUpdates.fingerprint(device)
+        update = resolved_updates.get(device.id, fingerprint)
+        if update is not None:
+            return update
+
+        update = await DeviceManager._resolve_update(device)
+        resolved_updates.set(device.id, fingerprint, update)
+        return update
+
+    @staticmethod
+    async def _resolve_update(device: Device) -> tuple[HandlingType, Software | None]:
         software = await DeviceManager._get_software(device)
 
         if software is None:
@@ -238,24 +661,61 @@ class DeviceManager:
         if log_data is None:
             return
 
-        if device.last_log is None:
-            device.last_log = ""
-
         # SWUpdate-specific log parsing to report progress
         matches = re.findall(r"Downloaded (\d+)%", log_data)
         if matches:
-            device.progress = matches[-1]
+            device.progress = int(matches[-1])
+            await DeviceManager.save_device(device, update_fields=["progress"])
 
-        device.last_log += f"{log_data}\n"
+        await device_logs.append(device, f"{log_data}\n")
 
-        await DeviceManager.save_device(device, update_fields=["progress", "last_log"])
+    @staticmethod
+    async def get_log(
+        device: Device, after: int | None = None, limit: int | None = None
+    ) -> tuple[str | None, int | None]:
+        return await device_logs.read(device, after, limit)
 
     @staticmethod
     async def delete_devices(ids: list[str]) -> None:
+        running = await Device.filter(id__in=ids, last_state=UpdateStateEnum.RUNNING).count()
         await Device.filter(id__in=ids).delete()
+        await running_updates.remove(running)
+        heartbeats.discard(ids)
+        resolved_updates.discard(ids)
+        device_logs.discard(ids)
         for dev_id in ids:
-            result = await caches.get("default").delete(dev_id)
-            assert result == 1, "device has been cached"
+            # entries may already have expired or been evicted from a shared cache
+            await device_cache.delete(dev_id)
+
+
+async def warm_up_caches() -> int:
+    """
+    Load the rollout and software indexes and recently seen devices into the caches, devices in batches ordered by
+    id. Returns the number of devices loaded.
+    """
+    settings = config.cache.warmup
+    start = time.monotonic()
+
+    await rollout_index.ensure_built()
+    await software_index.ensure_built()
+
+    query = Device.filter(last_seen__gte=round(time.time()) - settings.active_within).order_by("id")
+    loaded = 0
+    last_id: str | None = None
+    while loaded < settings.max_devices:
+        batch_query = query if last_id is None else query.filter(id__gt=last_id)
+        devices = await batch_query.limit(min(settings.batch_size, settings.max_devices - loaded))
+        if not devices:
+            break
+        for device in devices:
+            await device_cache.set(device.id, device, ttl=jittered_ttl())
+        loaded += len(devices)
+        last_id = devices[-1].id
+
+    duration = time.monotonic() - start
+    cache_warmup_duration.record(duration)
+    logger.info(f"Warmed up caches, devices={loaded}, duration={duration:.2f}s")
+    return loaded
 
 
 async def get_device(dev_id: str) -> Device:
@@ -263,4 +723,4 @@ async def get_device(dev_id: str) -> Device:
 
 
 async def get_device_or_none(dev_id: str) -> Optional[Device]:
-    return await Device.get_or_none(id=dev_id)  # type: ignore[no-any-return]
+    return await DeviceManager.find_device(dev_id)
@@ -0,0 +1,21 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from goosebit.settings import config
+from goosebit.ui.nav import nav
+
+
+class RequestContextMiddleware:
+    """
+    Attaches the config and the UI navigation to the request scope. The user is not loaded here, it is resolved
+    by `get_current_user` on first use and stored in the scope, so requests without a user session (devices,
+    downloads, static files) never look one up.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            scope["config"] = config
+            scope["nav"] = nav.get()
+        await self.app(scope, receive, send)
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import time
-from datetime import datetime
 from enum import Enum, IntEnum, StrEnum
 from typing import Annotated
 
@@ -9,7 +8,7 @@ from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, computed_fie
 
 from goosebit.db.models import UpdateModeEnum, UpdateStateEnum
 from goosebit.schema.software import HardwareSchema, SoftwareSchema
-from goosebit.settings import config
+from goosebit.updater.polling import poll_time_policy
 
 
 class ConvertableEnum(StrEnum):
@@ -62,5 +61,10 @@ class DeviceSchema(BaseModel):
     @computed_field  # type: ignore[prop-decorator]
     @property
     def poll_seconds(self) -> int:
-        time_obj = datetime.strptime(config.poll_time, "%H:%M:%S")
-        return time_obj.hour * 3600 + time_obj.minute * 60 + time_obj.second
+        # as handed out by the poll time policy, rules, jitter and load included
+        hardware = self.hardware
+        return round(
+            poll_time_policy.max_poll_seconds(
+                self.feed, hardware.model if hardware else None, hardware.revision if hardware else None
+            )
+        )
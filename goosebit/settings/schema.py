@@ -33,6 +33,13 @@ class DeviceAuthSettings(BaseModel):
     external_url: str | None = None
     external_mode: ExternalAuthMode = ExternalAuthMode.JSON
     external_json_key: str = "token"
+    external_timeout: float = 5  # seconds
+    external_cache_ttl: float = 300  # seconds to remember accepted tokens
+    external_negative_cache_ttl: float = 10  # seconds to remember rejected tokens
+    external_cache_size: int = 100000
+    external_failure_threshold: int = 5  # consecutive failures opening the circuit breaker
+    external_recovery_time: float = 30  # seconds until an open circuit breaker probes the service again
+    external_fail_open: bool = False  # accept tokens while the service is unavailable
 
     @model_validator(mode="after")
     def validate_external_mode_config(self) -> "DeviceAuthSettings":
@@ -63,11 +70,93 @@ class S3StorageSettings(BaseModel):
     endpoint_url: str | None = None
     access_key_id: str | None = None
     secret_access_key: str | None = None
+    presigned_urls: bool = False  # redirect downloads to presigned URLs instead of streaming through gooseBit
+    presigned_url_expiry: int = 300  # seconds
+    public_endpoint_url: str | None = None  # endpoint devices reach S3 at (e.g. CDN), defaults to endpoint_url
+    chunk_size: int = 1024 * 1024  # bytes read from S3 at once when streaming artifacts
+    read_ahead: int = 4  # chunks read ahead of the client per download
+    max_pool_connections: int = 50  # connections to S3 and threads reading from them
+
+
+class ArtifactCacheSettings(BaseModel):
+    enable: bool = False
+    max_bytes: int = 10 * 1024 * 1024 * 1024  # least recently used artifacts are removed beyond this
 
 
 class StorageSettings(BaseModel):
     backend: StorageType = StorageType.FILESYSTEM
     s3: S3StorageSettings | None = None
+    cache: ArtifactCacheSettings = ArtifactCacheSettings()  # local copies of artifacts streamed from S3 or http
+
+
+class CacheType(StrEnum):
+    MEMORY = "memory"  # in-process cache, only coherent with a single worker
+    REDIS = "redis"  # shared networked cache, required when running multiple workers
+
+
+class RedisCacheSettings(BaseModel):
+    endpoint: str = "localhost"
+    port: int = 6379
+    db: int = 0
+    password: str | None = None
+
+
+class CacheWarmupSettings(BaseModel):
+    enable: bool = False
+    active_within: int = 86400  # seconds, only devices seen within this period are loaded
+    max_devices: int = 100000
+    batch_size: int = 1000
+
+
+class CacheSettings(BaseModel):
+    backend: CacheType = CacheType.MEMORY
+    ttl: int = 600
+    ttl_jitter: float = 0.1  # spread expiry of device entries by up to this fraction of the ttl
+    max_entries: int = 1000000  # devices and users kept in memory (memory backend, per worker)
+    max_bytes: int = 512 * 1024 * 1024  # estimated size of devices and users kept in memory (memory backend)
+    namespace: str = "goosebit"
+    resolved_updates_size: int = 100000  # number of devices to remember the resolved update for (per worker)
+    verified_tokens_size: int = 10000  # number of verified user session tokens to remember (per worker)
+    unknown_device_ttl: int = 30  # seconds to remember device ids not registered, e.g. in strict device auth mode
+    warmup: CacheWarmupSettings = CacheWarmupSettings()
+    redis: RedisCacheSettings = RedisCacheSettings()  # used with the redis backend
+
+
+class PollTimeRule(BaseModel):
+    poll_time: str
+    feed: str | None = None
+    hw_model: str | None = None
+    hw_revision: str | None = None
+
+
+class PollingLoadSettings(BaseModel):
+    enable: bool = False
+    sample_interval: float = 5  # seconds between sampling the server load
+    loop_lag_threshold: float = 0.1  # seconds
+    db_latency_threshold: float = 0.25  # seconds
+    running_updates_threshold: int | None = None
+    max_factor: float = 4.0  # upper limit for stretching the poll time
+
+
+class PollingSettings(BaseModel):
+    rules: list[PollTimeRule] = Field(default_factory=list)  # first matching rule overrides poll_time
+    jitter: float = 0  # fraction of the poll time, e.g. 0.1 spreads devices over +/- 10%
+    load: PollingLoadSettings = PollingLoadSettings()
+
+
+class HeartbeatSettings(BaseModel):
+    flush_interval: float = 10  # seconds between writing buffered device connection updates to the database
+    batch_size: int = 500
+
+
+class DeviceLogSettings(BaseModel):
+    max_bytes: int = 1024 * 1024  # per device, oldest segments are removed first
+    max_deployments: int = 5  # per device, including the current one
+
+
+class PasswordHashingSettings(BaseModel):
+    workers: int = 2  # threads hashing and verifying passwords
+    max_queue: int = 32  # password operations running or waiting, further ones are rejected
 
 
 class GooseBitSettings(BaseSettings):
@@ -79,13 +168,17 @@ class GooseBitSettings(BaseSettings):
     tenant: str | list[str] = "DEFAULT"
 
     poll_time: str = "00:01:00"
+    polling: PollingSettings = PollingSettings()
 
     max_concurrent_updates: int = 1000
+    running_updates_reconcile_interval: float = 60  # seconds between recounting running updates in the database
 
     device_auth: DeviceAuthSettings = DeviceAuthSettings()
 
     secret_key: OctKey = Field(default_factory=OctKey.generate_key)
 
+    password_hashing: PasswordHashingSettings = PasswordHashingSettings()
+
     plugins: list[str] = Field(default_factory=list)
 
     db_uri: str = f"sqlite:///{GOOSEBIT_ROOT_DIR.joinpath('db.sqlite3')}"
@@ -95,12 +188,18 @@ class GooseBitSettings(BaseSettings):
 
     storage: StorageSettings = StorageSettings()
 
+    cache: CacheSettings = CacheSettings()
+
     metrics: MetricsSettings = MetricsSettings()
 
     logging: dict[str, Any] = LOGGING_DEFAULT
 
     track_device_ip: bool = True
 
+    heartbeat: HeartbeatSettings = HeartbeatSettings()
+
+    device_log: DeviceLogSettings = DeviceLogSettings()
+
     rauc_compatible_pattern: str | None = None
 
     @field_validator("secret_key", mode="before")
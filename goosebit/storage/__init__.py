@@ -1,7 +1,12 @@
+import time
 from typing import AsyncIterable
 
 from anyio import Path
 
+from goosebit.api.telemetry.metrics import (
+    artifact_transfer_bytes,
+    artifact_transfer_duration,
+)
 from goosebit.settings import config
 from goosebit.settings.schema import GooseBitSettings, StorageType
 from goosebit.storage.base import StorageProtocol
@@ -31,6 +36,12 @@ class GoosebitStorage:
                 endpoint_url=s3_config.endpoint_url,
                 access_key_id=s3_config.access_key_id,
                 secret_access_key=s3_config.secret_access_key,
+                presigned_urls=s3_config.presigned_urls,
+                presigned_url_expiry=s3_config.presigned_url_expiry,
+                public_endpoint_url=s3_config.public_endpoint_url,
+                chunk_size=s3_config.chunk_size,
+                read_ahead=s3_config.read_ahead,
+                max_pool_connections=s3_config.max_pool_connections,
             )
 
         else:
@@ -45,10 +56,30 @@ class GoosebitStorage:
     async def store_file(self, source_path: Path, dest_path: Path) -> str:
         return await self.backend.store_file(source_path, dest_path)
 
-    async def get_file_stream(self, uri: str) -> AsyncIterable[bytes]:
-        async for chunk in self.backend.get_file_stream(uri):  # type: ignore[attr-defined]
+    async def get_file_stream(self, uri: str, start: int = 0, end: int | None = None) -> AsyncIterable[bytes]:
+        """
+        Stream the bytes from `start` up to `end` (exclusive, end of file if None) of a stored file to a client.
+        """
+        async for chunk in self.record_transfer(
+            self.backend.get_file_stream(uri, start, end)  # type: ignore[arg-type]
+        ):
             yield chunk
 
+    async def record_transfer(self, stream: AsyncIterable[bytes]) -> AsyncIterable[bytes]:
+        """
+        Pass through an artifact streamed to a client, recording the transfer metrics.
+        """
+        started = time.monotonic()
+        transferred = 0
+        try:
+            async for chunk in stream:
+                transferred += len(chunk)
+                yield chunk
+        finally:
+            attributes = {"backend": str(self.config.storage.backend)}
+            artifact_transfer_bytes.record(transferred, attributes)
+            artifact_transfer_duration.record(time.monotonic() - started, attributes)
+
     async def get_download_url(self, uri: str) -> str:
         return await self.backend.get_download_url(uri)
 
@@ -58,6 +89,9 @@ class GoosebitStorage:
     async def delete_file(self, uri: str) -> bool:
         return await self.backend.delete_file(uri)
 
+    def close(self) -> None:
+        self.backend.close()
+
 
 # Init the module-level storage instance
 storage = GoosebitStorage(config)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import AsyncGenerator, AsyncIterable
+from uuid import uuid4
+
+from anyio import AsyncFile, Path, open_file
+
+from goosebit.api.telemetry.metrics import artifact_streams_coalesced
+from goosebit.db.models import Software
+from goosebit.settings import config
+from goosebit.storage import storage
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PATTERN = re.compile(r"^[0-9a-fA-F]{16,128}$")
+STALE_TEMP_FILE_AGE = 3600  # seconds
+TAIL_CHUNK_SIZE = 1024 * 1024
+
+
+def _upstream(software: Software, start: int = 0) -> AsyncIterable[bytes]:
+    # straight from the backend, transfers are recorded per client stream
+    return storage.backend.get_file_stream(software.uri, start)  # type: ignore[return-value]
+
+
+class ArtifactFetch:
+    """
+    Download of an artifact from upstream into a temp file, tailed by all concurrent streams of the artifact while it
+    grows. Runs on its own, so that it is not aborted along with the stream that started it.
+    """
+
+    def __init__(self, software: Software, temp_path: Path):
+        self.software = software
+        self.temp_path = temp_path
+        self.size = 0
+        self.done = False
+        self.failed = False
+        self.readers = 0
+        self.opening = 0
+        self.task: asyncio.Task[None] | None = None
+        self._created = asyncio.Event()
+        self._progress = asyncio.Event()
+
+    async def run(self) -> bool:
+        """
+        Fetch the artifact, returns whether it matches its hash.
+        """
+        digest = hashlib.sha1()
+        try:
+            try:
+                file = await open_file(self.temp_path, "wb")
+            finally:
+                self._created.set()
+            async with file:
+                async for chunk in _upstream(self.software):
+                    await file.write(chunk)
+                    await file.flush()
+                    digest.update(chunk)
+                    self.size += len(chunk)
+                    self._notify()
+                    if self.readers == 0 and not config.storage.cache.enable:
+                        # nobody is waiting for it anymore
+                        self.failed = True
+                        return False
+        except BaseException:
+            self.failed = True
+            raise
+        finally:
+            self.done = True
+            self._notify()
+        return digest.hexdigest() == self.software.hash.lower()
+
+    def _notify(self) -> None:
+        progress, self._progress = self._progress, asyncio.Event()
+        progress.set()
+
+    async def open(self) -> AsyncFile[bytes] | None:
+        """
+        Open the temp file for tailing, None if it could not be created or opened.
+        """
+        self.readers += 1
+        self.opening += 1
+        try:
+            await self._created.wait()
+            if self.failed and self.size == 0:
+                return None
+            return await open_file(self.temp_path, "rb")
+        except OSError as e:
+            logger.warning(f"Opening artifact temp file failed, software={self.software.id}, error={e}")
+            return None
+        finally:
+            self.opening -= 1
+            self._notify()
+
+    async def opened(self) -> None:
+        # the temp file must stay in place until all streams that joined have opened it
+        while self.opening:
+            await self._progress.wait()
+
+    async def tail(self, file: AsyncFile[bytes] | None) -> AsyncIterable[bytes]:
+        if file is None:
+            async for chunk in _upstream(self.software):
+                yield chunk
+            return
+
+        position = 0
+        while True:
+            if position < self.size:
+                chunk = await file.read(min(self.size - position, TAIL_CHUNK_SIZE))
+                position += len(chunk)
+                yield chunk
+            elif self.failed:
+                # resume from upstream where this stream stopped
+                async for chunk in _upstream(self.software, position):
+                    yield chunk
+                return
+            elif self.done:
+                return
+            else:
+                await self._progress.wait()
+
+
+class ArtifactCache:
+    """
+    Read-through disk cache of remote (S3, http) artifacts, keyed by software hash. Artifacts are fetched from
+    upstream into a temp file, which concurrent full downloads stream while it grows. If enabled, complete artifacts
+    matching their hash are kept, the least recently used ones are evicted beyond `storage.cache.max_bytes`. If
+    disabled, a single download of an artifact is streamed directly, only concurrent ones go through a temp file.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._entries: OrderedDict[str, int] | None = None
+        self._fetches: dict[str, ArtifactFetch] = {}
+        self._direct: set[str] = set()
+
+    @staticmethod
+    def enabled() -> bool:
+        return config.storage.cache.enable
+
+    @staticmethod
+    def cacheable(software: Software) -> bool:
+        # the hash becomes a file name, only accept actual hashes
+        return not software.local and CACHE_KEY_PATTERN.match(software.hash) is not None
+
+    def path(self, software: Software) -> Path:
+        return self.directory.joinpath(software.hash)
+
+    async def get(self, software: Software) -> Path | None:
+        if not self.cacheable(software):
+            return None
+        entries = await self._index()
+        if software.hash not in entries:
+            return None
+        path = self.path(software)
+        if not await path.exists():
+            # evicted by another worker
+            del entries[software.hash]
+            return None
+        entries.move_to_end(software.hash)
+        return path
+
+    async def stream(self, software: Software) -> AsyncIterable[bytes]:
+        """
+        Stream the full artifact to a client, sharing a single upstream fetch between concurrent streams.
+        """
+        if not self.cacheable(software):
+            async for chunk in storage.get_file_stream(software.uri):
+                yield chunk
+            return
+
+        # recorded per stream, the shared fetch is not a client download
+        async with aclosing(self._tail(software)) as chunks:
+            async for chunk in storage.record_transfer(chunks):
+                yield chunk
+
+    async def _tail(self, software: Software) -> AsyncGenerator[bytes, None]:
+        fetch = self._fetches.get(software.hash)
+        if fetch is None and not self.enabled() and software.hash not in self._direct:
+            # nothing to share with (yet), not worth going through the disk
+            self._direct.add(software.hash)
+            try:
+                async for chunk in _upstream(software):
+                    yield chunk
+            finally:
+                self._direct.discard(software.hash)
+            return
+
+        if fetch is None:
+            try:
+                await self.directory.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Artifact cache directory not writable, streaming directly, error={e}")
+                async for chunk in _upstream(software):
+                    yield chunk
+                return
+            fetch = self._fetches.get(software.hash)
+        if fetch is None:
+            fetch = ArtifactFetch(software, self.directory.joinpath(f"{software.hash}.{uuid4().hex}.tmp"))
+            self._fetches[software.hash] = fetch
+            fetch.task = asyncio.create_task(self._fetch(fetch))
+        else:
+            artifact_streams_coalesced.add(1)
+
+        try:
+            file = await fetch.open()
+            try:
+                async for chunk in fetch.tail(file):
+                    yield chunk
+            finally:
+                if file is not None:
+                    await file.aclose()
+        finally:
+            fetch.readers -= 1
+
+    async def _fetch(self, fetch: ArtifactFetch) -> None:
+        software = fetch.software
+        valid = False
+        try:
+            valid = await fetch.run()
+            if not valid and not fetch.failed:
+                logger.warning(f"Artifact does not match its hash, not caching it, software={software.id}")
+        except Exception as e:
+            logger.warning(f"Fetching artifact failed, software={software.id}, error={e}")
+        finally:
+            # streams tailing the temp file keep reading it through their open file
+            del self._fetches[software.hash]
+            await fetch.opened()
+            if valid and self.enabled():
+                await fetch.temp_path.rename(self.path(software))
+                await self._add(software.hash, fetch.size)
+            else:
+                await fetch.temp_path.unlink(missing_ok=True)
+
+    async def _index(self) -> OrderedDict[str, int]:
+        if self._entries is None:
+            files = []
+            if await self.directory.exists():
+                async for path in self.directory.iterdir():
+                    stat = await path.stat()
+                    if path.suffix == ".tmp":
+                        # left over from an interrupted download, unless another worker is still writing it
+                        if time.time() - stat.st_mtime > STALE_TEMP_FILE_AGE:
+                            await path.unlink(missing_ok=True)
+                        continue
+                    files.append((stat.st_mtime, path.name, stat.st_size))
+            self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        return self._entries
+
+    async def _add(self, key: str, size: int) -> None:
+        entries = await self._index()
+        entries[key] = size
+        entries.move_to_end(key)
+        total = sum(entries.values())
+        while total > config.storage.cache.max_bytes and len(entries) > 1:
+            evicted, evicted_size = entries.popitem(last=False)
+            await self.directory.joinpath(evicted).unlink(missing_ok=True)
+            total -= evicted_size
+
+    def clear(self) -> None:
+        self._entries = None
+
+
+artifact_cache = ArtifactCache(Path(config.artifacts_dir).joinpath(".cache"))
@@ -8,6 +8,17 @@ from anyio import Path, open_file
 from .base import StorageProtocol
 
 
+async def _slice(chunks: AsyncIterable[bytes], start: int, end: int | None) -> AsyncIterable[bytes]:
+    position = 0
+    async for chunk in chunks:
+        chunk_start, position = position, position + len(chunk)
+        if position <= start:
+            continue
+        if end is not None and chunk_start >= end:
+            break
+        yield chunk[max(start - chunk_start, 0) : None if end is None else end - chunk_start]
+
+
 class FilesystemStorageBackend(StorageProtocol):
     def __init__(self, base_path: Path):
         self.base_path = Path(base_path)
@@ -21,26 +32,38 @@ class FilesystemStorageBackend(StorageProtocol):
         final_dest_path_resolved = await final_dest_path.resolve()
         return final_dest_path_resolved.as_uri()
 
-    async def get_file_stream(self, uri: str) -> AsyncIterable[bytes]:  # type: ignore[override]
+    async def get_file_stream(  # type: ignore[override]
+        self, uri: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterable[bytes]:
         parsed = urlparse(uri)
 
         if parsed.scheme in ("http", "https"):
+            headers = {"Range": f"bytes={start}-{'' if end is None else end - 1}"} if start or end is not None else {}
             async with httpx.AsyncClient() as client:
-                async with client.stream("GET", uri) as response:
+                async with client.stream("GET", uri, headers=headers) as response:
                     response.raise_for_status()
-                    async for chunk in response.aiter_bytes(8192):
+                    chunks: AsyncIterable[bytes] = response.aiter_bytes(8192)
+                    if headers and response.status_code != 206:
+                        # server ignored the range, skip to it
+                        chunks = _slice(chunks, start, end)
+                    async for chunk in chunks:
                         yield chunk
 
         elif parsed.scheme == "file":
             file_path = self._extract_path_from_uri(uri)
-            if not file_path.exists():
+            if not await file_path.exists():
                 raise FileNotFoundError(f"File not found: {file_path}")
 
+            remaining = None if end is None else end - start
             async with await open_file(file_path, "rb") as f:
-                while True:
-                    chunk = await f.read(8192)
+                if start:
+                    await f.seek(start)
+                while remaining is None or remaining > 0:
+                    chunk = await f.read(8192 if remaining is None else min(8192, remaining))
                     if not chunk:
                         break
+                    if remaining is not None:
+                        remaining -= len(chunk)
                     yield chunk
         else:
             raise ValueError(f"Unsupported URI scheme '{parsed.scheme}' for filesystem backend: {uri}")
@@ -79,6 +102,9 @@ class FilesystemStorageBackend(StorageProtocol):
         else:
             raise ValueError(f"Cannot delete remote file: {uri}")
 
+    def close(self) -> None:
+        pass
+
     def _extract_path_from_uri(self, uri: str) -> Path:
         parsed = urlparse(uri)
 
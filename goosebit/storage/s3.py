@@ -1,5 +1,7 @@
 import asyncio
-from typing import AsyncIterable
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterable
 from urllib.parse import urlparse
 
 from anyio import Path
@@ -18,8 +20,20 @@ class S3StorageBackend(StorageProtocol):
         endpoint_url: str | None = None,
         access_key_id: str | None = None,
         secret_access_key: str | None = None,
+        presigned_urls: bool = False,
+        presigned_url_expiry: int = 300,
+        public_endpoint_url: str | None = None,
+        chunk_size: int = 1024 * 1024,
+        read_ahead: int = 4,
+        max_pool_connections: int = 50,
     ):
         self.bucket = bucket
+        self.presigned_urls = presigned_urls
+        self.presigned_url_expiry = presigned_url_expiry
+        self.chunk_size = chunk_size
+        self.read_ahead = read_ahead
+        # blocking S3 reads get their own threads, one per pooled connection
+        self.executor = ThreadPoolExecutor(max_workers=max_pool_connections, thread_name_prefix="s3")
 
         config = Config(
             region_name=region,
@@ -27,6 +41,7 @@ class S3StorageBackend(StorageProtocol):
             read_timeout=60,
             retries={"max_attempts": 5, "mode": "adaptive"},
             signature_version="s3v4",
+            max_pool_connections=max_pool_connections,
         )
 
         session_config = {}
@@ -38,6 +53,11 @@ class S3StorageBackend(StorageProtocol):
         session = Session(**session_config)
 
         self.s3_client = session.client("s3", config=config, endpoint_url=endpoint_url)
+        # URLs are signed for the host devices download from, signing itself does not connect to it
+        if public_endpoint_url is not None:
+            self.presign_client = session.client("s3", config=config, endpoint_url=public_endpoint_url)
+        else:
+            self.presign_client = self.s3_client
 
     async def store_file(self, source_path: Path, dest_path: Path) -> str:
         key = str(dest_path).replace("\\", "/").lstrip("/")  # Convert path to S3 key
@@ -49,30 +69,70 @@ class S3StorageBackend(StorageProtocol):
         except ClientError as e:
             raise ValueError(f"S3 upload failed: {e}")
 
-    async def get_file_stream(self, uri: str) -> AsyncIterable[bytes]:  # type: ignore[override]
+    async def get_file_stream(  # type: ignore[override]
+        self, uri: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterable[bytes]:
         key = self._extract_key_from_uri(uri)
+        params = {"Bucket": self.bucket, "Key": key}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
 
+        loop = asyncio.get_running_loop()
         try:
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(None, lambda: self.s3_client.get_object(Bucket=self.bucket, Key=key))
-
-            body = response["Body"]
-            try:
-                while True:
-                    chunk = await loop.run_in_executor(None, body.read, 8192)
-                    if not chunk:
-                        break
-                    yield chunk
-            finally:
-                await loop.run_in_executor(None, body.close)
-
+            response = await loop.run_in_executor(self.executor, lambda: self.s3_client.get_object(**params))
         except ClientError as e:
             raise ValueError(f"S3 download failed: {e}")
 
+        # read ahead of the client in the background, so that S3 reads overlap with writes to the client
+        body = response["Body"]
+        chunks: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.read_ahead)
+        reader = asyncio.create_task(self._read_ahead(body, chunks))
+        try:
+            while (chunk := await chunks.get()) is not None:
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await reader
+            await loop.run_in_executor(self.executor, body.close)
+
+    async def _read_ahead(self, body: Any, chunks: asyncio.Queue[Any]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while chunk := await self._read(loop, body):
+                await chunks.put(chunk)
+            await chunks.put(None)
+        except ClientError as e:
+            await chunks.put(ValueError(f"S3 download failed: {e}"))
+        except Exception as e:
+            await chunks.put(e)
+
+    async def _read(self, loop: asyncio.AbstractEventLoop, body: Any) -> bytes:
+        read = loop.run_in_executor(self.executor, body.read, self.chunk_size)
+        try:
+            return await asyncio.shield(read)
+        except asyncio.CancelledError:
+            # cancelling does not stop the read in its thread, the body must not be closed before it returns
+            await asyncio.wait([read])
+            raise
+
     async def get_download_url(self, uri: str) -> str:
         parsed = urlparse(uri)
         if parsed.scheme in ("http", "https"):
             return uri
+        elif parsed.scheme == "s3" and self.presigned_urls:
+            key = self._extract_key_from_uri(uri)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None,
+                lambda: self.presign_client.generate_presigned_url(
+                    "get_object",
+                    Params={"Bucket": self.bucket, "Key": key},
+                    ExpiresIn=self.presigned_url_expiry,
+                ),
+            )
         else:
             raise ValueError(f"Fallback to streaming as S3 service might not be exposed externally: {uri}")
 
@@ -97,6 +157,10 @@ class S3StorageBackend(StorageProtocol):
         except ClientError as e:
             raise ValueError(f"S3 delete failed: {e}")
 
+    def close(self) -> None:
+        # reads still blocked on S3 are not waited for
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
     def _extract_key_from_uri(self, uri: str) -> str:
         if not uri.startswith(f"s3://{self.bucket}/"):
             raise ValueError(f"Invalid S3 URI for bucket {self.bucket}: {uri}")
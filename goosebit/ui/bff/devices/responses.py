@@ -5,6 +5,7 @@ from typing import Any, Callable
 from pydantic import BaseModel, Field
 from tortoise.queryset import QuerySet
 
+from goosebit.device_manager import heartbeats
 from goosebit.schema.devices import DeviceSchema
 from goosebit.ui.bff.common.requests import DataTableRequest
 
@@ -35,6 +36,9 @@ class BFFDeviceResponse(BaseModel):
             query = query.limit(dt_query.length)
 
         devices = await query.offset(dt_query.start).all()
+        for d in devices:
+            # last seen and IP are written to the database with a delay, prefer the buffered values
+            heartbeats.apply(d)
         data = [DeviceSchema.model_validate(d) for d in devices]
 
         return cls(data=data, draw=dt_query.draw, records_total=total_records, records_filtered=filtered_records)
@@ -1,33 +1,15 @@
 from fastapi import APIRouter, HTTPException, Response
 from fastapi.requests import Request
-from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 
 from goosebit.db.models import Software
-from goosebit.storage import storage
+from goosebit.updates.artifacts import artifact_response
 
 router = APIRouter(prefix="/download", tags=["download"])
 
 
 @router.get("/{file_id}")
-async def download_file(_: Request, file_id: int) -> Response:
+async def download_file(request: Request, file_id: int) -> Response:
     software = await Software.get_or_none(id=file_id)
     if software is None:
         raise HTTPException(404)
-    if software.local:
-        return FileResponse(
-            software.path,
-            media_type="application/octet-stream",
-            filename=software.path.name,
-        )
-
-    try:
-        url = await storage.get_download_url(software.uri)
-        return RedirectResponse(url=url)
-    except ValueError:
-        # Fallback to streaming if redirect fails.
-        file_stream = storage.get_file_stream(software.uri)
-        return StreamingResponse(
-            file_stream,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={software.path.name}"},
-        )
+    return await artifact_response(request, software)
@@ -11,6 +11,7 @@ from goosebit.api.v1.software import routes
 from goosebit.auth import validate_user_permissions
 from goosebit.auth.permissions import GOOSEBIT_PERMISSIONS
 from goosebit.db.models import Hardware, Rollout, Software
+from goosebit.device_manager import DeviceManager
 from goosebit.storage import storage
 from goosebit.ui.bff.common.requests import DataTableRequest
 from goosebit.ui.bff.common.util import parse_datatables_query
@@ -88,6 +89,7 @@ async def put_update(
             rollout_count = await Rollout.filter(software=software).count()
             if rollout_count == 0:
                 await software.delete()
+                await DeviceManager.notify_software_changed()
             else:
                 raise HTTPException(409, "Software with same URL already exists and is referenced by rollout")
 
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import AsyncGenerator
+
+from fastapi import Depends
+
+from goosebit.api.telemetry.metrics import device_lookups
+from goosebit.db.models import Device
+from goosebit.device_manager import DeviceManager
+
+
+class DeviceContext:
+    """
+    Device of a DDI request, resolved at most once and shared by the router dependencies and the endpoint handler.
+    """
+
+    def __init__(self, dev_id: str):
+        self.dev_id = dev_id
+        self.lookups = 0
+        self._device: Device | None = None
+
+    async def find(self) -> Device | None:
+        """
+        Get the device if it is registered, without registering it.
+        """
+        if self._device is None and self.lookups == 0:
+            self.lookups += 1
+            self._device = await DeviceManager.find_device(self.dev_id)
+        return self._device
+
+    async def get(self) -> Device:
+        """
+        Get the device, registering it if needed.
+        """
+        if self._device is None:
+            self.lookups += 1
+            self._device = await DeviceManager.get_device(self.dev_id)
+        return self._device
+
+
+async def device_context(dev_id: str) -> AsyncGenerator[DeviceContext, None]:
+    # FastAPI caches dependencies per request, all dependants of this function share one context
+    context = DeviceContext(dev_id)
+    yield context
+    device_lookups.record(context.lookups)
+
+
+async def get_device(context: DeviceContext = Depends(device_context)) -> Device:
+    return await context.get()
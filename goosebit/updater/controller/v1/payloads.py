@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import urlparse
+from uuid import uuid4
+
+from fastapi.requests import Request
+from fastapi.responses import Response
+
+from goosebit.db.models import Software
+from goosebit.device_manager import HandlingType
+from goosebit.schema.updates import UpdateChunk, UpdateChunkArtifact
+
+# placeholders spliced with the base URL, device and action id per request
+BASE_URL = f"base-url-{uuid4().hex}"
+DEV_ID = f"dev-id-{uuid4().hex}"
+ACTION_ID = f"action-id-{uuid4().hex}"
+
+
+def encode_json(content: Any) -> bytes:
+    # same encoding as FastAPI's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _json_string(value: str) -> bytes:
+    return json.dumps(value, ensure_ascii=False)[1:-1].encode()
+
+
+def _splice(template: bytes, request: Request, dev_id: str) -> bytes:
+    # device ids and base URLs end up inside JSON strings, escape them accordingly
+    return template.replace(DEV_ID.encode(), _json_string(dev_id)).replace(
+        BASE_URL.encode(), _json_string(base_url(request))
+    )
+
+
+def base_url(request: Request) -> str:
+    return str(request.base_url).rstrip("/")
+
+
+class LinkTemplates:
+    """
+    DDI link paths resolved once with placeholders for the base URL, device and action id, so that polls do not
+    have to go through route resolution. The base URL comes from the client's Host header and is only spliced in per
+    request, it must not end up in a key.
+    """
+
+    def __init__(self) -> None:
+        self._templates: dict[str, str] = {}
+
+    def get(self, request: Request, name: str) -> str:
+        template = self._templates.get(name)
+        if template is None:
+            params = {"dev_id": DEV_ID}
+            if name == "deployment_base":
+                params["action_id"] = ACTION_ID
+            template = BASE_URL + str(request.app.url_path_for(name, **params))
+            self._templates[name] = template
+        return template
+
+    def url(self, request: Request, name: str, dev_id: str, action_id: int | None = None) -> str:
+        url = self.get(request, name).replace(DEV_ID, dev_id)
+        if action_id is not None:
+            url = url.replace(ACTION_ID, str(action_id))
+        return url.replace(BASE_URL, base_url(request))
+
+    def clear(self) -> None:
+        self._templates.clear()
+
+
+class ChunkTemplates:
+    """
+    Serialized deployment chunks per software, with placeholders for the base URL and device id.
+    """
+
+    max_size = 1024
+
+    def __init__(self) -> None:
+        self._templates: OrderedDict[tuple[int, str], bytes] = OrderedDict()
+
+    def get(self, request: Request, software: Software) -> bytes:
+        # software entries are immutable, the hash guards against reused ids
+        key = (software.id, software.hash)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._build(request, software)
+            self._templates[key] = template
+            if len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        else:
+            self._templates.move_to_end(key)
+        return template
+
+    @staticmethod
+    def _build(request: Request, software: Software) -> bytes:
+        # For remote http(s) URLs, pass the original URL directly to the device.
+        # For s3:// or file:// URIs, use the download endpoint which handles proxying.
+        if urlparse(software.uri).scheme in ("http", "https"):
+            href = software.uri
+        else:
+            href = link_templates.get(request, "download_artifact")
+
+        chunk = UpdateChunk(
+            name=software.path.name,
+            version=software.version,
+            artifacts=[
+                UpdateChunkArtifact(
+                    filename=software.path.name,
+                    hashes={"sha1": software.hash},
+                    size=software.size,
+                    links={"download": {"href": href}},
+                )
+            ],
+        )
+        return encode_json([chunk.model_dump(by_alias=True)])
+
+    def clear(self) -> None:
+        self._templates.clear()
+
+
+link_templates = LinkTemplates()
+chunk_templates = ChunkTemplates()
+
+
+def json_response(content: bytes) -> Response:
+    return Response(content, media_type="application/json")
+
+
+def polling_payload(sleep: str, links: dict[str, dict[str, str]]) -> Response:
+    return json_response(encode_json({"config": {"polling": {"sleep": sleep}}, "_links": links}))
+
+
+def software_chunks(request: Request, software: Software, dev_id: str) -> bytes:
+    return _splice(chunk_templates.get(request, software), request, dev_id)
+
+
+def deployment_payload(action_id: int, handling_type: HandlingType, chunks: bytes) -> Response:
+    head = encode_json(
+        {"id": str(action_id), "deployment": {"download": str(handling_type), "update": str(handling_type)}}
+    )
+    # append the chunks to the deployment object, this avoids decoding the serialized chunks again
+    return json_response(head[:-2] + b',"chunks":' + chunks + b"}}")
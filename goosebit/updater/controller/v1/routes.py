@@ -1,21 +1,24 @@
 import logging
-from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.requests import Request
-from fastapi.responses import (
-    FileResponse,
-    RedirectResponse,
-    Response,
-    StreamingResponse,
-)
+from fastapi.responses import Response
+from tortoise.expressions import F
 
-from goosebit.db.models import Device, Software, UpdateStateEnum
-from goosebit.device_manager import DeviceManager, HandlingType, get_device
+from goosebit.db.models import Device, Rollout, Software, UpdateStateEnum
+from goosebit.device_manager import DeviceManager, HandlingType, running_updates
 from goosebit.settings import config
-from goosebit.storage import storage
-from goosebit.updates import generate_chunk
-
+from goosebit.updater.context import get_device
+from goosebit.updater.polling import poll_time_policy
+from goosebit.updates.artifacts import artifact_headers, artifact_response
+
+from .payloads import (
+    deployment_payload,
+    encode_json,
+    link_templates,
+    polling_payload,
+    software_chunks,
+)
 from .schema import (
     ConfigDataSchema,
     FeedbackSchema,
@@ -29,25 +32,18 @@ router = APIRouter(prefix="/v1")
 
 
 @router.get("/{dev_id}")
-async def polling(request: Request, device: Device = Depends(get_device)) -> dict[str, Any]:
+async def polling(request: Request, device: Device = Depends(get_device)) -> Response:
     links: dict[str, dict[str, str]] = {}
 
     if device is None:
         raise HTTPException(404)
 
-    sleep = config.poll_time
+    sleep = await poll_time_policy.get(device)
 
     if device.last_state == UpdateStateEnum.UNKNOWN:
         # device registration: force device to poll again in 10s. After registration, an update might be available
         sleep = "00:00:10"
-        links["configData"] = {
-            "href": str(
-                request.url_for(
-                    "config_data",
-                    dev_id=device.id,
-                )
-            )
-        }
+        links["configData"] = {"href": link_templates.url(request, "config_data", device.id)}
         logger.info(f"Skip: registration required, device={device.id}")
 
     elif device.last_state == UpdateStateEnum.ERROR and not device.force_update:
@@ -58,39 +54,25 @@ async def polling(request: Request, device: Device = Depends(get_device)) -> dic
         # won't confirm a successful testing (might be a bug/problem in swupdate)
         handling_type, software = await DeviceManager.get_update(device)
         if handling_type != HandlingType.SKIP and software is not None:
-            number_of_running = await Device.filter(last_state=UpdateStateEnum.RUNNING).count()
+            number_of_running = await running_updates.get()
             if number_of_running < config.max_concurrent_updates or device.last_state == UpdateStateEnum.RUNNING:
                 links["deploymentBase"] = {
-                    "href": str(
-                        request.url_for(
-                            "deployment_base",
-                            dev_id=device.id,
-                            action_id=software.id,
-                        )
-                    )
+                    "href": link_templates.url(request, "deployment_base", device.id, action_id=software.id)
                 }
                 logger.info(f"Forced: update available, device={device.id}")
         else:
-            number_of_running = await Device.filter(last_state=UpdateStateEnum.RUNNING).count()
+            number_of_running = await running_updates.get()
             if number_of_running < config.max_concurrent_updates or device.last_state == UpdateStateEnum.RUNNING:
                 plugin_sources = await DeviceManager.get_alt_src_updates(request, device)
                 for handling_type, _ in plugin_sources:
                     if handling_type == HandlingType.SKIP:
                         continue
                     links["deploymentBase"] = {
-                        "href": str(
-                            request.url_for(
-                                "deployment_base",
-                                dev_id=device.id,
-                                action_id=-1,  # custom plugin
-                            )
-                        )
+                        # custom plugin
+                        "href": link_templates.url(request, "deployment_base", device.id, action_id=-1)
                     }
                     break
-    return {
-        "config": {"polling": {"sleep": sleep}},
-        "_links": links,
-    }
+    return polling_payload(sleep, links)
 
 
 @router.put("/{dev_id}/configData")
@@ -100,37 +82,24 @@ async def config_data(_: Request, cfg: ConfigDataSchema, device: Device = Depend
     return {"success": True, "message": "Updated swupdate data."}
 
 
-@router.get("/{dev_id}/deploymentBase/{action_id}")
+@router.get("/{dev_id}/deploymentBase/{action_id}", response_model=None)
 async def deployment_base(
     request: Request,
     action_id: int,
     device: Device = Depends(get_device),
-) -> dict[str, Any] | None:
+) -> Response | None:
     handling_type, software = await DeviceManager.get_update(device)
 
     logger.info(f"Request deployment base, device={device.id}")
     if not handling_type == HandlingType.SKIP:
-        return {
-            "id": str(action_id),
-            "deployment": {
-                "download": str(handling_type),
-                "update": str(handling_type),
-                "chunks": [chunk.model_dump(by_alias=True) for chunk in (await generate_chunk(request, device))],
-            },
-        }
+        chunks = software_chunks(request, software, device.id) if software is not None else b"[]"
+        return deployment_payload(action_id, handling_type, chunks)
     else:
         plugin_sources = await DeviceManager.get_alt_src_updates(request, device)
         for handling_type, chunk in plugin_sources:
             if handling_type == HandlingType.SKIP or chunk is None:
                 continue
-            return {
-                "id": str(action_id),
-                "deployment": {
-                    "download": str(handling_type),
-                    "update": str(handling_type),
-                    "chunks": [chunk.model_dump(by_alias=True)],
-                },
-            }
+            return deployment_payload(action_id, handling_type, encode_json([chunk.model_dump(by_alias=True)]))
     return None
 
 
@@ -159,8 +128,7 @@ async def deployment_feedback(
             rollout = await DeviceManager.get_rollout(device)
             if rollout:
                 if rollout.software == reported_software:
-                    rollout.success_count += 1
-                    await rollout.save()
+                    await Rollout.filter(id=rollout.id).update(success_count=F("success_count") + 1)
                 else:
                     # edge case where device update mode got changed while update was running
                     logging.warning(
@@ -180,8 +148,7 @@ async def deployment_feedback(
             rollout = await DeviceManager.get_rollout(device)
             if rollout:
                 if rollout.software == reported_software:
-                    rollout.failure_count += 1
-                    await rollout.save()
+                    await Rollout.filter(id=rollout.id).update(failure_count=F("failure_count") + 1)
                 else:
                     # edge case where device update mode got changed while update was running
                     logging.warning(
@@ -210,32 +177,14 @@ async def download_artifact_head(_: Request, device: Device = Depends(get_device
     if software is None:
         raise HTTPException(404)
 
-    response = Response()
+    response = Response(headers=artifact_headers(software))
     response.headers["Content-Length"] = str(software.size)
     return response
 
 
 @router.get("/{dev_id}/download")
-async def download_artifact(_: Request, device: Device = Depends(get_device)) -> Response:
+async def download_artifact(request: Request, device: Device = Depends(get_device)) -> Response:
     handling_type, software = await DeviceManager.get_update(device)
     if software is None:
         raise HTTPException(404)
-
-    if software.local:
-        return FileResponse(
-            software.path,
-            media_type="application/octet-stream",
-            filename=software.path.name,
-        )
-
-    try:
-        url = await storage.get_download_url(software.uri)
-        return RedirectResponse(url=url)
-    except ValueError:
-        # Fallback to streaming if redirect fails.
-        file_stream = storage.get_file_stream(software.uri)
-        return StreamingResponse(
-            file_stream,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={software.path.name}"},
-        )
+    return await artifact_response(request, software)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+import httpx
+
+from goosebit.cache import SingleFlight
+from goosebit.settings import config
+from goosebit.settings.schema import ExternalAuthMode
+
+logger = logging.getLogger(__name__)
+
+
+class ExternalAuthUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling the external auth service after consecutive failures. Once the recovery time passed, a single
+    request is let through to probe whether the service is back.
+    """
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= config.device_auth.external_recovery_time:
+            # half open: let this request probe the service, others keep failing fast until it reports back
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= config.device_auth.external_failure_threshold:
+            if self.opened_at is None:
+                logger.warning("External auth service failing, opening circuit breaker")
+            self.opened_at = time.monotonic()
+
+
+class ExternalTokenVerifier:
+    """
+    Verifies device tokens with the external auth service through a pooled client. Results are cached by token hash,
+    positive ones for `external_cache_ttl` and negative ones for `external_negative_cache_ttl`, and concurrent
+    verifications of the same token share a single request.
+    """
+
+    def __init__(self) -> None:
+        self.breaker = CircuitBreaker()
+        self._client: httpx.AsyncClient | None = None
+        self._cache: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+        self._verifications: SingleFlight[bool] = SingleFlight("external_auth")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=config.device_auth.external_timeout)
+        return self._client
+
+    async def verify(self, token: str) -> bool:
+        key = hashlib.sha256(token.encode()).hexdigest()
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            valid, expires = cached
+            if time.monotonic() < expires:
+                return valid
+            del self._cache[key]
+
+        return await self._verifications.run(key, lambda: self._verify(token, key))
+
+    async def _verify(self, token: str, key: str) -> bool:
+        if not self.breaker.allow():
+            return self._unavailable("circuit breaker open")
+
+        try:
+            response = await self._request(token)
+        except Exception as e:
+            # not only connection errors (httpx.RequestError), anything failing the request counts against the service
+            self.breaker.record_failure()
+            return self._unavailable(str(e))
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            return self._unavailable(f"status {response.status_code}")
+        self.breaker.record_success()
+
+        valid = response.status_code == 200
+        ttl = config.device_auth.external_cache_ttl if valid else config.device_auth.external_negative_cache_ttl
+        if ttl > 0:
+            self._cache[key] = (valid, time.monotonic() + ttl)
+            while len(self._cache) > config.device_auth.external_cache_size:
+                self._cache.popitem(last=False)
+        return valid
+
+    async def _request(self, token: str) -> httpx.Response:
+        url = config.device_auth.external_url
+        assert url is not None
+        if config.device_auth.external_mode == ExternalAuthMode.BEARER:
+            return await self.client.post(url, headers={"Authorization": f"Bearer {token}"})
+        return await self.client.post(url, json={config.device_auth.external_json_key: token})
+
+    @staticmethod
+    def _unavailable(reason: str) -> bool:
+        if config.device_auth.external_fail_open:
+            logger.warning(f"External auth service unavailable, accepting token, reason={reason}")
+            return True
+        raise ExternalAuthUnavailable(reason)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self.breaker.record_success()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+external_tokens = ExternalTokenVerifier()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from zlib import crc32
+
+from tortoise import Tortoise
+
+from goosebit.api.telemetry.metrics import poll_time_factor
+from goosebit.db.models import Device, Hardware
+from goosebit.device_manager import running_updates
+from goosebit.settings import config
+from goosebit.settings.schema import PollTimeRule
+from goosebit.util.tasks import PeriodicTask
+
+
+def parse_poll_time(poll_time: str) -> int:
+    hours, minutes, seconds = (int(part) for part in poll_time.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def format_poll_time(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class LoadMonitor:
+    """
+    Samples server load signals (event loop lag, database latency, running updates) and derives a factor to stretch
+    the poll time of devices with, so that the fleet backs off while the server is overloaded.
+    """
+
+    def __init__(self) -> None:
+        self.loop_lag = 0.0
+        self.db_latency = 0.0
+        self.running_updates = 0
+        self.factor = 1.0
+        self._task = PeriodicTask("poll-load-monitor", self.sample, lambda: config.polling.load.sample_interval)
+
+    async def sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.sleep(0)
+        self.loop_lag = loop.time() - start
+
+        start = time.monotonic()
+        await Tortoise.get_connection("default").execute_query("SELECT 1")
+        self.db_latency = time.monotonic() - start
+
+        self.running_updates = await running_updates.get()
+
+        self.factor = self.calculate_factor()
+        poll_time_factor.set(self.factor)
+
+    def calculate_factor(self) -> float:
+        settings = config.polling.load
+        ratios = [self.loop_lag / settings.loop_lag_threshold, self.db_latency / settings.db_latency_threshold]
+        if settings.running_updates_threshold:
+            ratios.append(self.running_updates / settings.running_updates_threshold)
+        return min(max([1.0, *ratios]), settings.max_factor)
+
+    def start(self) -> None:
+        if config.polling.load.enable:
+            self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+        self.factor = 1.0
+
+
+class PollTimePolicy:
+    """
+    Determines the poll time (DDI `sleep`) of a device from per feed and per hardware rules, deterministic per device
+    jitter and the current server load.
+    """
+
+    def __init__(self) -> None:
+        self.load = LoadMonitor()
+        self._hardware: dict[int, tuple[str, str]] = {}
+
+    async def get(self, device: Device) -> str:
+        poll_time = await self._base_poll_time(device)
+        base_seconds = parse_poll_time(poll_time)
+
+        seconds = float(base_seconds)
+        if config.polling.jitter:
+            # spread in [-jitter, +jitter], stable for a device so that its poll interval stays regular
+            spread = crc32(device.id.encode()) / 0xFFFFFFFF * 2 - 1
+            seconds *= 1 + spread * config.polling.jitter
+        seconds *= self.load.factor
+
+        if round(seconds) == base_seconds:
+            return poll_time
+        return format_poll_time(max(round(seconds), 1))
+
+    async def _base_poll_time(self, device: Device) -> str:
+        for rule in config.polling.rules:
+            if await self._matches(rule, device):
+                return rule.poll_time
+        return config.poll_time
+
+    def max_poll_seconds(self, feed: str | None, hw_model: str | None, hw_revision: str | None) -> float:
+        """
+        Longest poll time currently handed out to devices of a feed and hardware, including jitter and load.
+        """
+        poll_time = config.poll_time
+        for rule in config.polling.rules:
+            if (rule.feed is None or rule.feed == feed) and self._matches_hardware(rule, hw_model, hw_revision):
+                poll_time = rule.poll_time
+                break
+        return parse_poll_time(poll_time) * (1 + config.polling.jitter) * self.load.factor
+
+    async def _matches(self, rule: PollTimeRule, device: Device) -> bool:
+        if rule.feed is not None and rule.feed != device.feed:
+            return False
+        if rule.hw_model is None and rule.hw_revision is None:
+            return True
+
+        model, revision = await self._hardware_name(device.hardware_id)
+        return self._matches_hardware(rule, model, revision)
+
+    @staticmethod
+    def _matches_hardware(rule: PollTimeRule, model: str | None, revision: str | None) -> bool:
+        if rule.hw_model is not None and rule.hw_model != model:
+            return False
+        if rule.hw_revision is not None and rule.hw_revision != revision:
+            return False
+        return True
+
+    async def _hardware_name(self, hardware_id: int) -> tuple[str, str]:
+        # hardware entries are never modified, so they can be cached without invalidation
+        name = self._hardware.get(hardware_id)
+        if name is None:
+            hardware = await Hardware.get(id=hardware_id)
+            name = (hardware.model, hardware.revision)
+            self._hardware[hardware_id] = name
+        return name
+
+
+poll_time_policy = PollTimePolicy()
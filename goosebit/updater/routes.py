@@ -1,18 +1,18 @@
 import time
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.requests import Request
 
-from goosebit.device_manager import DeviceManager, get_device_or_none
-from goosebit.settings.schema import DeviceAuthMode, ExternalAuthMode
+from goosebit.device_manager import DeviceManager
+from goosebit.settings.schema import DeviceAuthMode
 
-from ..db.models import Device
 from . import controller
+from .context import DeviceContext, device_context
+from .external_auth import ExternalAuthUnavailable, external_tokens
 
 
-async def log_last_connection(request: Request, dev_id: str) -> None:
-    device = await get_device_or_none(dev_id)
+async def log_last_connection(request: Request, context: DeviceContext = Depends(device_context)) -> None:
+    device = await context.find()
 
     if not device:
         return
@@ -24,7 +24,7 @@ async def log_last_connection(request: Request, dev_id: str) -> None:
         await DeviceManager.update_last_connection(device, round(time.time()))
 
 
-async def validate_device_token(request: Request, dev_id: str) -> None:
+async def validate_device_token(request: Request, context: DeviceContext = Depends(device_context)) -> None:
     if not request.scope["config"].device_auth.enable:
         return
 
@@ -38,14 +38,14 @@ async def validate_device_token(request: Request, dev_id: str) -> None:
 
     # setup mode should register devices and set up their auth token
     if request.scope["config"].device_auth.mode == DeviceAuthMode.SETUP:
-        device = await DeviceManager.get_device(dev_id)
+        device = await context.get()
         if device_token is None:
             return
         await DeviceManager.update_auth_token(device, device_token)
 
     # lax mode should register devices and check their token if they have one, but not register their tokens
     elif request.scope["config"].device_auth.mode == DeviceAuthMode.LAX:
-        device = await DeviceManager.get_device(dev_id)
+        device = await context.get()
         # should not be possible
         assert device is not None
 
@@ -57,7 +57,7 @@ async def validate_device_token(request: Request, dev_id: str) -> None:
         if device_token is None:
             raise HTTPException(401, "Device authentication token is required in strict mode.")
         # do not create a device in strict mode
-        device_obj = await Device.get_or_none(id=dev_id)
+        device_obj = await context.find()
         if device_obj is None:
             raise HTTPException(401, "Cannot register a new device in strict mode.")
         if not device_obj.auth_token == device_token:
@@ -69,27 +69,13 @@ async def validate_device_token(request: Request, dev_id: str) -> None:
             raise HTTPException(401, "Device authentication token is required in external mode.")
 
         try:
-            async with httpx.AsyncClient() as client:
-                if request.scope["config"].device_auth.external_mode == ExternalAuthMode.BEARER:
-                    response = await client.post(
-                        request.scope["config"].device_auth.external_url,
-                        headers={"Authorization": f"Bearer {device_token}"},
-                    )
-                elif request.scope["config"].device_auth.external_mode == ExternalAuthMode.JSON:
-                    json = {request.scope["config"].device_auth.external_json_key: device_token}
-                    response = await client.post(
-                        request.scope["config"].device_auth.external_url,
-                        json=json,
-                    )
-
-                if response.status_code != 200:
-                    raise HTTPException(401, "Device authentication token is invalid.")
-                else:
-                    await DeviceManager.get_device(dev_id)
-        except httpx.RequestError as e:
+            valid = await external_tokens.verify(device_token)
+        except ExternalAuthUnavailable as e:
             raise HTTPException(401, f"Error communicating with authentication service: {str(e)}")
-        except Exception as e:
-            raise HTTPException(401, f"Error: {str(e)}")
+
+        if not valid:
+            raise HTTPException(401, "Device authentication token is invalid.")
+        await context.get()
 
 
 router = APIRouter(
@@ -69,6 +69,7 @@ async def create_software_update(uri: str, temp_file: Path | None) -> Software:
         revision = comp.get("hw_revision", "default")
         await software.compatibility.add((await Hardware.get_or_create(model=model, revision=revision))[0])
     await software.save()
+    await DeviceManager.notify_software_changed()
     return software  # type: ignore[no-any-return]
 
 
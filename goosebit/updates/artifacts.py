@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+
+from fastapi import HTTPException
+from fastapi.requests import Request
+from fastapi.responses import (
+    FileResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
+
+from goosebit.db.models import Software
+from goosebit.storage import storage
+from goosebit.storage.cache import artifact_cache
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(request: Request, software: Software) -> tuple[int, int] | None:
+    """
+    Byte range (start, end exclusive) requested by a single range `Range` header. Returns None if the whole artifact
+    is to be sent: no, malformed or multiple ranges, or an `If-Range` not matching the artifact.
+    """
+    header = request.headers.get("range")
+    if header is None:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range != etag(software):
+        return None
+
+    match = RANGE_PATTERN.match(header.replace(" ", ""))
+    if match is None:
+        return None
+    first, last = match.groups()
+    size = software.size
+
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last) + 1, size) if last else size
+    elif last:
+        # suffix range, the last n bytes
+        start, end = max(size - int(last), 0), size
+    else:
+        return None
+
+    if start >= end:
+        raise HTTPException(416, "Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def etag(software: Software) -> str:
+    return f'"{software.hash}"'
+
+
+def artifact_headers(software: Software) -> dict[str, str]:
+    return {
+        "Accept-Ranges": "bytes",
+        "ETag": etag(software),
+        "Content-Disposition": f"attachment; filename={software.path.name}",
+    }
+
+
+async def artifact_response(request: Request, software: Software) -> Response:
+    if software.local:
+        # serves ranges on its own
+        return FileResponse(
+            software.path,
+            media_type="application/octet-stream",
+            filename=software.path.name,
+        )
+
+    try:
+        url = await storage.get_download_url(software.uri)
+        return RedirectResponse(url=url)
+    except ValueError:
+        pass
+
+    # Fallback to streaming if redirect fails.
+    if artifact_cache.enabled():
+        path = await artifact_cache.get(software)
+        if path is not None:
+            # serves ranges on its own, the hash as ETag keeps If-Range valid across cached and streamed responses
+            return FileResponse(
+                path,
+                media_type="application/octet-stream",
+                filename=software.path.name,
+                headers={"ETag": etag(software)},
+            )
+    return stream_artifact(request, software)
+
+
+def stream_artifact(request: Request, software: Software) -> Response:
+    headers = artifact_headers(software)
+    byte_range = parse_range(request, software)
+    if byte_range is None:
+        headers["Content-Length"] = str(software.size)
+        # concurrent downloads of the artifact share a single fetch from upstream
+        return StreamingResponse(
+            artifact_cache.stream(software), media_type="application/octet-stream", headers=headers
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end - 1}/{software.size}"
+    headers["Content-Length"] = str(end - start)
+    return StreamingResponse(
+        storage.get_file_stream(software.uri, start, end),
+        status_code=206,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
@@ -1,12 +1,16 @@
-from aiocache import caches
-
 from goosebit.api.telemetry.metrics import users_count
+from goosebit.cache import ModelCache
 from goosebit.db.models import User
-from goosebit.settings import PWD_CXT  # type: ignore[attr-defined]
+from goosebit.settings import config
+from goosebit.util.passwords import password_hasher
+
+user_cache = ModelCache("user", User)
 
 
 async def create_user(username: str, password: str, permissions: list[str]) -> User:
-    return await UserManager.setup_user(username=username, hashed_pwd=PWD_CXT.hash(password), permissions=permissions)
+    return await UserManager.setup_user(
+        username=username, hashed_pwd=await password_hasher.hash(password), permissions=permissions
+    )
 
 
 async def create_initial_user(username: str, hashed_pwd: str) -> User:
@@ -19,8 +23,7 @@ class UserManager:
         await user.save(update_fields=update_fields)
 
         # only update cache after a successful database save
-        result = await caches.get("default").set(user.username, user, ttl=600)
-        assert result, "user being cached"
+        await user_cache.set(user.username, user, ttl=config.cache.ttl)
 
     @staticmethod
     async def update_enabled(user: User, enabled: bool) -> None:
@@ -43,15 +46,13 @@ class UserManager:
 
     @staticmethod
     async def get_user(username: str) -> User:
-        cache = caches.get("default")
-        user = await cache.get(username)
+        user = await user_cache.get(username)
         if user:
-            return user  # type: ignore[no-any-return]
+            return user
 
         user = await User.get_or_none(username=username)
         if user is not None:
-            result = await cache.set(user.username, user, ttl=600)
-            assert result, "user being cached"
+            await user_cache.set(user.username, user, ttl=config.cache.ttl)
 
         return user  # type: ignore[no-any-return]
 
@@ -59,5 +60,5 @@ class UserManager:
     async def delete_users(usernames: list[str]) -> None:
         await User.filter(username__in=usernames).delete()
         for username in usernames:
-            await caches.get("default").delete(username)
+            await user_cache.delete(username)
         users_count.set(await User.all().count())
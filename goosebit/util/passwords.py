@@ -0,0 +1,71 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from argon2.exceptions import VerifyMismatchError
+from fastapi import HTTPException
+
+from goosebit.api.telemetry.metrics import (
+    password_hashing_duration,
+    password_hashing_queue,
+    password_hashing_rejected,
+)
+from goosebit.settings import PWD_CXT, config  # type: ignore[attr-defined]
+
+T = TypeVar("T")
+
+
+class PasswordHasherPool:
+    """
+    Runs Argon2 password hashing and verification in a dedicated thread pool, so that it does not block the event
+    loop. Argon2 releases the GIL while hashing. Requests beyond the queue limit are rejected instead of piling up.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=config.password_hashing.workers, thread_name_prefix="password-hashing"
+            )
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", PWD_CXT.hash, password)
+
+    async def verify(self, hashed_pwd: str, password: str) -> bool:
+        return await self._run("verify", _verify, hashed_pwd, password)
+
+    async def _run(self, operation: str, func: Callable[..., T], *args: Any) -> T:
+        if self._pending >= config.password_hashing.max_queue:
+            password_hashing_rejected.add(1, {"operation": operation})
+            raise HTTPException(503, "Too many concurrent password operations, try again later.")
+
+        self._pending += 1
+        password_hashing_queue.set(self._pending)
+        start = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self._pending -= 1
+            password_hashing_queue.set(self._pending)
+            password_hashing_duration.record(time.monotonic() - start, {"operation": operation})
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _verify(hashed_pwd: str, password: str) -> bool:
+    try:
+        return PWD_CXT.verify(hashed_pwd, password)
+    except VerifyMismatchError:
+        return False
+
+
+password_hasher = PasswordHasherPool()
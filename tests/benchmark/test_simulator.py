@@ -0,0 +1,19 @@
+import pytest
+
+from tests.benchmark.simulator import simulate
+
+
+@pytest.mark.asyncio
+async def test_simulator_runs_full_update_cycle() -> None:
+    result = await simulate(devices=5, duration=60, cycles=3, poll_time=0, failure_rate=0, artifact_size=1024)
+
+    assert result.updated == 5
+    assert result.failed == 0
+    assert len(result.endpoints["poll"].latencies) == 15
+    assert len(result.endpoints["configData"].latencies) == 5
+    assert len(result.endpoints["deploymentBase"].latencies) == 5
+    assert len(result.endpoints["feedback"].latencies) == 10
+    assert len(result.endpoints["download"].latencies) == 5
+    assert all(stats.errors == 0 for stats in result.endpoints.values())
+    assert result.endpoints["configData"].queries > 0
+    assert "poll" in result.report()
@@ -1,4 +1,4 @@
-from goosebit.auth import check_permissions
+from goosebit.auth import check_permissions, compile_permissions
 from goosebit.auth.permissions import GOOSEBIT_PERMISSIONS
 
 
@@ -41,3 +41,20 @@ def test_multiple_root_wildcard_permissions() -> None:
         ],
         ["goosebit.*.read", "goosebit.device.write"],
     )
+
+
+def test_deny_permission() -> None:
+    permissions = ["goosebit.*", "!goosebit.device.delete"]
+    assert check_permissions([GOOSEBIT_PERMISSIONS["device"]["write"]()], permissions)
+    assert not check_permissions([GOOSEBIT_PERMISSIONS["device"]["delete"]()], permissions)
+
+
+def test_permission_more_specific_than_scope() -> None:
+    assert not check_permissions([GOOSEBIT_PERMISSIONS["device"]()], ["goosebit.device.read"])
+    assert check_permissions([GOOSEBIT_PERMISSIONS["device"]()], ["goosebit.device.*"])
+
+
+def test_compiled_permissions_are_cached() -> None:
+    permissions = ("goosebit.device.read", "!goosebit.software")
+    assert compile_permissions(permissions) is compile_permissions(tuple(list(permissions)))
+    assert compile_permissions(permissions) is not compile_permissions(("goosebit.device.read",))
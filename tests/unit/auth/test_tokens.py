@@ -0,0 +1,91 @@
+from typing import Any, Generator
+
+import pytest
+from httpx import AsyncClient
+from joserfc import jwt
+
+from goosebit.auth import create_token, get_user_from_token, verified_tokens
+from goosebit.settings import config
+from goosebit.users import UserManager
+
+
+@pytest.fixture
+def decode_calls(monkeypatch: Any) -> Generator[list[str], None, None]:
+    calls: list[str] = []
+    decode = jwt.decode
+
+    def _decode(token: str, *args: Any) -> Any:
+        calls.append(token)
+        return decode(token, *args)
+
+    monkeypatch.setattr(jwt, "decode", _decode)
+    verified_tokens.clear()
+    yield calls
+    verified_tokens.clear()
+
+
+def test_verified_tokens_are_cached(decode_calls: list[str], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.cache, "verified_tokens_size", 2)
+    tokens = [create_token(f"user{i}") for i in range(3)]
+
+    assert verified_tokens.get_username(tokens[0]) == "user0"
+    assert verified_tokens.get_username(tokens[0]) == "user0"
+    assert len(decode_calls) == 1
+
+    # least recently used token is evicted
+    verified_tokens.get_username(tokens[1])
+    verified_tokens.get_username(tokens[2])
+    verified_tokens.get_username(tokens[0])
+    assert decode_calls == [tokens[0], tokens[1], tokens[2], tokens[0]]
+
+
+@pytest.mark.asyncio
+async def test_invalid_token(decode_calls: list[str]) -> None:
+    assert await get_user_from_token("invalid") is None
+    assert await get_user_from_token("invalid") is None
+    assert len(decode_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_user_resolution_per_request(
+    async_client: AsyncClient, test_data: dict[str, Any], monkeypatch: Any
+) -> None:
+    calls = 0
+    get_user = UserManager.get_user
+
+    async def _get_user(username: str) -> Any:
+        nonlocal calls
+        calls += 1
+        return await get_user(username)
+
+    monkeypatch.setattr(UserManager, "get_user", _get_user)
+
+    response = await async_client.get("/api/v1/devices")
+    assert response.status_code == 200
+    assert calls == 1
+
+    # devices never carry a user session
+    response = await async_client.get(f"/DEFAULT/controller/v1/{test_data['device_rollout'].id}")
+    assert response.status_code == 200
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_user_loaded_lazily(async_client: AsyncClient, monkeypatch: Any) -> None:
+    calls = 0
+    get_user = UserManager.get_user
+
+    async def _get_user(username: str) -> Any:
+        nonlocal calls
+        calls += 1
+        return await get_user(username)
+
+    monkeypatch.setattr(UserManager, "get_user", _get_user)
+
+    response = await async_client.get("/static/favicon.svg")
+    assert response.status_code == 200
+    assert calls == 0
+
+    response = await async_client.get("/ui/devices")
+    assert response.status_code == 200
+    assert calls == 1
@@ -0,0 +1,202 @@
+import asyncio
+import pickle
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import pytest
+
+import goosebit.cache
+from goosebit.cache import (
+    LocalCache,
+    ModelCache,
+    NamespacedCache,
+    SharedCounter,
+    SingleFlight,
+    create_cache_config,
+    local_cache,
+)
+from goosebit.db.models import Device
+from goosebit.settings import config
+from goosebit.settings.schema import CacheSettings, CacheType, RedisCacheSettings
+
+
+def test_memory_cache_is_default() -> None:
+    cache_config = create_cache_config(CacheSettings())
+
+    assert cache_config["cache"] == "aiocache.SimpleMemoryCache"
+    assert cache_config["ttl"] == 600
+
+
+def test_redis_cache(monkeypatch: Any) -> None:
+    monkeypatch.setattr(goosebit.cache, "find_spec", lambda _: object())
+
+    cache_config = create_cache_config(
+        CacheSettings(backend=CacheType.REDIS, ttl=60, redis=RedisCacheSettings(endpoint="redis", port=6380, db=1))
+    )
+
+    assert cache_config["cache"] == "aiocache.RedisCache"
+    assert cache_config["endpoint"] == "redis"
+    assert cache_config["port"] == 6380
+    assert cache_config["db"] == 1
+    assert cache_config["namespace"] == "goosebit"
+    assert cache_config["ttl"] == 60
+
+
+def test_redis_cache_default_settings(monkeypatch: Any) -> None:
+    monkeypatch.setattr(goosebit.cache, "find_spec", lambda _: object())
+
+    cache_config = create_cache_config(CacheSettings(backend=CacheType.REDIS))
+
+    assert cache_config["cache"] == "aiocache.RedisCache"
+    assert cache_config["endpoint"] == "localhost"
+    assert cache_config["port"] == 6379
+
+
+def test_redis_cache_missing_dependency(monkeypatch: Any) -> None:
+    monkeypatch.setattr(goosebit.cache, "find_spec", lambda _: None)
+
+    with pytest.raises(RuntimeError):
+        create_cache_config(CacheSettings(backend=CacheType.REDIS, redis=RedisCacheSettings()))
+
+
+def test_local_cache_bounds(monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.cache, "max_entries", 2)
+    cache = LocalCache()
+
+    cache.set("a", 1, None)
+    cache.set("b", 2, None)
+    cache.get("a")
+    cache.set("c", 3, None)
+    # least recently used entry is evicted
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+    monkeypatch.setattr(config.cache, "max_bytes", cache.size)
+    cache.set("d", ("a" * 100,), None)
+    assert len(cache) < 2
+    assert cache.size <= config.cache.max_bytes
+
+    cache.set("e", 5, -1)
+    assert cache.get("e") is None
+    assert "e" not in cache._entries
+
+
+@pytest.mark.asyncio
+async def test_model_cache(test_data: dict[str, Any]) -> None:
+    device = test_data["device_rollout"]
+    device_cache = ModelCache("test_device", Device)
+
+    await device_cache.set(device.id, device)
+    snapshot = local_cache.get(f"test_device:{device.id}")
+    assert isinstance(snapshot, tuple)
+
+    cached = await device_cache.get(device.id)
+    assert cached is not None and cached is not device
+    assert cached.id == device.id
+    assert cached.update_mode == device.update_mode
+    assert cached.hardware_id == device.hardware_id
+    # each read restores a new instance
+    assert await device_cache.get(device.id) is not cached
+
+    cached.name = "renamed"
+    await cached.save(update_fields=["name"])
+    assert (await Device.get(id=device.id)).name == "renamed"
+
+    await device_cache.delete(device.id)
+    assert await device_cache.get(device.id) is None
+
+
+class FakeRedis:
+    """
+    Stands in for the redis backend, a separate store holding serialized values like aiocache.RedisCache does.
+    """
+
+    def __init__(self) -> None:
+        self.data: dict[str, Any] = {}
+
+    async def exists(self, key: str) -> bool:
+        return key in self.data
+
+    async def get(self, key: str, loads_fn: Callable[[Any], Any] = pickle.loads) -> Any:
+        value = self.data.get(key)
+        return None if value is None else loads_fn(value)
+
+    async def set(
+        self, key: str, value: Any, ttl: int | None = None, dumps_fn: Callable[[Any], Any] = pickle.dumps
+    ) -> None:
+        self.data[key] = dumps_fn(value)
+
+    async def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+    async def increment(self, key: str, delta: int = 1) -> int:
+        value = int(self.data.get(key, 0)) + delta
+        self.data[key] = str(value)
+        return value
+
+
+@pytest.mark.asyncio
+async def test_shared_caches(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    redis = FakeRedis()
+    monkeypatch.setattr(goosebit.cache, "caches", SimpleNamespace(get=lambda alias: redis))
+    monkeypatch.setattr(config.cache, "backend", CacheType.REDIS)
+    device = test_data["device_rollout"]
+    device_cache = ModelCache("test_device", Device)
+    flags: NamespacedCache[bool] = NamespacedCache("test_flag")
+
+    await device_cache.set(device.id, device)
+    await flags.set("a", True)
+    # stored in the shared cache, not in the worker's memory
+    assert len(local_cache) == 0
+    assert await redis.exists(f"test_device:{device.id}")
+
+    cached = await device_cache.get(device.id)
+    assert cached is not None and cached is not device
+    assert cached.hardware_id == device.hardware_id
+    assert await flags.get("a") is True
+
+    await flags.delete("a")
+    assert await flags.get("a") is None
+    assert not await redis.exists("test_flag:a")
+
+    counter = SharedCounter("test_counter")
+    await counter.set(1)
+    assert await counter.increment(2) == 3
+    assert await counter.get() == 3
+
+
+@pytest.mark.asyncio
+async def test_single_flight_leader_cancelled() -> None:
+    fills = 0
+    release = asyncio.Event()
+
+    async def fill() -> list[int]:
+        nonlocal fills
+        fills += 1
+        await release.wait()
+        return [fills]
+
+    single_flight: SingleFlight[list[int]] = SingleFlight("test")
+    leader = asyncio.create_task(single_flight.run("key", fill))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(single_flight.run("key", fill)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    # a waiter takes over the fill, the others keep waiting for it
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await asyncio.gather(*waiters) == [[2]] * 3
+    assert leader.cancelled()
+    assert fills == 2
+
+    # cancelled waiters do not affect the fill
+    release.clear()
+    leader = asyncio.create_task(single_flight.run("key", fill))
+    waiter = asyncio.create_task(single_flight.run("key", fill))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    release.set()
+    assert await leader == [3]
+    assert waiter.cancelled()
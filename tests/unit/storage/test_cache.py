@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Any, AsyncIterable
+
+import pytest
+from anyio import Path as AsyncPath
+from fastapi.requests import Request
+from fastapi.responses import FileResponse
+
+import goosebit.updates.artifacts
+from goosebit.api.telemetry.metrics import artifact_transfer_bytes
+from goosebit.db.models import Software
+from goosebit.settings import config
+from goosebit.storage import storage
+from goosebit.storage.cache import ArtifactCache
+from goosebit.updates.artifacts import artifact_response
+
+
+class FakeUpstream:
+    def __init__(self) -> None:
+        self.artifacts: dict[str, bytes] = {}
+        self.requests: list[tuple[str, int]] = []
+        self.fail_at: int | None = None
+
+    def add(self, data: bytes, software_id: int = 1, hash: str | None = None) -> Software:
+        uri = f"s3://goosebit/update-{software_id}.swu"
+        self.artifacts[uri] = data
+        return Software(
+            id=software_id, version="1", hash=hash or hashlib.sha1(data).hexdigest(), size=len(data), uri=uri
+        )
+
+    async def get_file_stream(self, uri: str, start: int = 0, end: int | None = None) -> AsyncIterable[bytes]:
+        self.requests.append((uri, start))
+        data = self.artifacts[uri]
+        for i in range(start, len(data) if end is None else end, 4):
+            if i == self.fail_at:
+                self.fail_at = None
+                raise OSError("connection reset")
+            # let concurrent streams run
+            await asyncio.sleep(0)
+            yield data[i : i + 4]
+
+
+async def _read(stream: AsyncIterable[bytes]) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.fixture
+def upstream(monkeypatch: Any) -> FakeUpstream:
+    upstream = FakeUpstream()
+    monkeypatch.setattr(storage, "_backend", upstream)
+    return upstream
+
+
+@pytest.fixture
+def cache(tmp_path: Path, monkeypatch: Any) -> ArtifactCache:
+    monkeypatch.setattr(config.storage.cache, "enable", True)
+    return ArtifactCache(AsyncPath(tmp_path))
+
+
+async def _settled(cache: ArtifactCache) -> None:
+    await asyncio.gather(*[fetch.task for fetch in cache._fetches.values() if fetch.task is not None])
+
+
+@pytest.mark.asyncio
+async def test_read_through(cache: ArtifactCache, upstream: FakeUpstream) -> None:
+    data = b"0123456789"
+    software = upstream.add(data)
+    assert await cache.get(software) is None
+
+    assert await _read(cache.stream(software)) == data
+    await _settled(cache)
+    path = await cache.get(software)
+    assert path is not None
+    assert await path.read_bytes() == data
+
+    # index is rebuilt from the cache directory
+    cache.clear()
+    assert await cache.get(software) == path
+
+
+@pytest.mark.asyncio
+async def test_not_cached(cache: ArtifactCache, upstream: FakeUpstream, monkeypatch: Any) -> None:
+    data = b"0123456789"
+
+    # corrupted upstream data
+    software = upstream.add(data, hash=hashlib.sha1(b"other data").hexdigest())
+    assert await _read(cache.stream(software)) == data
+    await _settled(cache)
+    assert await cache.get(software) is None
+
+    # aborted download, fetching goes on as long as the cache is enabled
+    software = upstream.add(data, 2)
+    stream = cache.stream(software)
+    await anext(stream)  # type: ignore[call-overload]
+    await stream.aclose()  # type: ignore[attr-defined]
+    await _settled(cache)
+    assert await cache.get(software) is not None
+
+    monkeypatch.setattr(config.storage.cache, "enable", False)
+    software = upstream.add(data[::-1], 3)
+    stream = cache.stream(software)
+    await anext(stream)  # type: ignore[call-overload]
+    await stream.aclose()  # type: ignore[attr-defined]
+    await _settled(cache)
+    assert await cache.get(software) is None
+    assert [path.name async for path in cache.directory.iterdir()] == [upstream.add(data, 2).hash]
+
+
+@pytest.mark.asyncio
+async def test_fan_out(cache: ArtifactCache, upstream: FakeUpstream, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.storage.cache, "enable", False)
+    transfers: list[int] = []
+    monkeypatch.setattr(artifact_transfer_bytes, "record", lambda amount, attributes: transfers.append(amount))
+    data = bytes(range(256)) * 4
+    software = upstream.add(data)
+
+    first = cache.stream(software)
+    assert await anext(first) == data[:4]  # type: ignore[call-overload]
+    # the first download is streamed directly, concurrent ones share a fetch started by the second one
+    results = await asyncio.gather(_read(first), *[_read(cache.stream(software)) for _ in range(10)])
+    assert results == [data[4:]] + [data] * 10
+    assert upstream.requests == [(software.uri, 0)] * 2
+    # transfers are recorded per stream, not for the shared fetch
+    assert transfers == [len(data)] * 11
+
+    await _settled(cache)
+    assert [path async for path in cache.directory.iterdir()] == []
+
+
+@pytest.mark.asyncio
+async def test_direct_stream(cache: ArtifactCache, upstream: FakeUpstream, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.storage.cache, "enable", False)
+    data = b"0123456789"
+    software = upstream.add(data)
+
+    stream = cache.stream(software)
+    assert await anext(stream) == data[:4]  # type: ignore[call-overload]
+    # a single download does not go through the disk
+    assert [path async for path in cache.directory.iterdir()] == []
+    assert await _read(stream) == data[4:]
+
+
+@pytest.mark.asyncio
+async def test_directory_not_writable(tmp_path: Path, upstream: FakeUpstream, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.storage.cache, "enable", True)
+    tmp_path.joinpath("file").write_bytes(b"")
+    cache = ArtifactCache(AsyncPath(tmp_path).joinpath("file", ".cache"))
+    data = b"0123456789"
+    software = upstream.add(data)
+
+    # streamed directly instead
+    assert list(await asyncio.gather(_read(cache.stream(software)), _read(cache.stream(software)))) == [data, data]
+    assert await cache.get(software) is None
+
+
+@pytest.mark.asyncio
+async def test_fan_out_resume(cache: ArtifactCache, upstream: FakeUpstream) -> None:
+    data = bytes(range(256))
+    software = upstream.add(data)
+    upstream.fail_at = 100
+
+    results = await asyncio.gather(*[_read(cache.stream(software)) for _ in range(3)])
+    # streams resume from upstream where the failed fetch left them
+    assert results == [data] * 3
+    assert upstream.requests == [(software.uri, 0)] + [(software.uri, 100)] * 3
+    await _settled(cache)
+    assert await cache.get(software) is None
+
+
+@pytest.mark.asyncio
+async def test_eviction(cache: ArtifactCache, upstream: FakeUpstream, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.storage.cache, "max_bytes", 25)
+    software = [upstream.add(bytes([i]) * 10, i) for i in range(3)]
+
+    await _read(cache.stream(software[0]))
+    await _settled(cache)
+    await _read(cache.stream(software[1]))
+    await _settled(cache)
+    await cache.get(software[0])
+    await _read(cache.stream(software[2]))
+    await _settled(cache)
+
+    # least recently used one is evicted
+    assert await cache.get(software[1]) is None
+    assert await cache.get(software[0]) is not None
+    assert await cache.get(software[2]) is not None
+
+
+@pytest.mark.asyncio
+async def test_cached_artifact_response(cache: ArtifactCache, upstream: FakeUpstream, monkeypatch: Any) -> None:
+    async def _get_download_url(uri: str) -> str:
+        raise ValueError("no redirect")
+
+    monkeypatch.setattr(storage, "get_download_url", _get_download_url)
+    monkeypatch.setattr(goosebit.updates.artifacts, "artifact_cache", cache)
+    software = upstream.add(b"0123456789")
+    await _read(cache.stream(software))
+    await _settled(cache)
+
+    response = await artifact_response(Request({"type": "http", "method": "GET", "path": "/", "headers": []}), software)
+    assert isinstance(response, FileResponse)
+    assert response.path == await cache.get(software)
+    assert response.headers["etag"] == f'"{software.hash}"'
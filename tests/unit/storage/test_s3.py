@@ -0,0 +1,182 @@
+import asyncio
+import io
+import threading
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi.requests import Request
+
+from goosebit.db.models import Software
+from goosebit.storage import storage
+from goosebit.storage.s3 import S3StorageBackend
+from goosebit.updates.artifacts import artifact_response
+
+
+def _backend(**kwargs: Any) -> S3StorageBackend:
+    return S3StorageBackend(bucket="goosebit", access_key_id="minioadmin", secret_access_key="minioadmin", **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_presigned_download_url() -> None:
+    backend = _backend(endpoint_url="http://minio:9000", presigned_urls=True, presigned_url_expiry=60)
+
+    url = urlparse(await backend.get_download_url("s3://goosebit/software/update.swu"))
+    assert url.netloc == "minio:9000"
+    assert url.path == "/goosebit/software/update.swu"
+    query = parse_qs(url.query)
+    assert query["X-Amz-Expires"] == ["60"]
+    assert "X-Amz-Signature" in query
+
+
+@pytest.mark.asyncio
+async def test_presigned_download_url_public_endpoint() -> None:
+    backend = _backend(
+        endpoint_url="http://minio:9000", presigned_urls=True, public_endpoint_url="https://artifacts.example.com"
+    )
+
+    url = urlparse(await backend.get_download_url("s3://goosebit/update.swu"))
+    assert url.scheme == "https"
+    assert url.netloc == "artifacts.example.com"
+
+
+@pytest.mark.asyncio
+async def test_download_url_without_presigning() -> None:
+    backend = _backend()
+
+    assert await backend.get_download_url("https://example.com/update.swu") == "https://example.com/update.swu"
+    with pytest.raises(ValueError):
+        await backend.get_download_url("s3://goosebit/update.swu")
+
+
+@pytest.mark.asyncio
+async def test_download_redirects_to_presigned_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = _backend(endpoint_url="http://minio:9000", presigned_urls=True)
+    monkeypatch.setattr(storage, "_backend", backend)
+    software = Software(version="1", hash="abc", size=10, uri="s3://goosebit/update.swu")
+
+    response = await artifact_response(Request({"type": "http", "method": "GET", "path": "/", "headers": []}), software)
+    assert response.status_code == 307
+    assert response.headers["location"].startswith("http://minio:9000/goosebit/update.swu?")
+
+
+class FakeBody(io.BytesIO):
+    fail = False
+
+    def read(self, size: int | None = -1) -> bytes:
+        if self.fail:
+            raise ConnectionError("connection reset")
+        return super().read(size)
+
+
+class SlowBody(FakeBody):
+    """
+    Body whose reads after the first one block until released.
+    """
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = 0
+        self.reading = threading.Event()
+        self.release = threading.Event()
+        self.closed_while_reading = False
+
+    def read(self, size: int | None = -1) -> bytes:
+        self.reads += 1
+        if self.reads > 1:
+            self.reading.set()
+            self.release.wait(5)
+        try:
+            return super().read(size)
+        finally:
+            self.reading.clear()
+
+    def close(self) -> None:
+        self.closed_while_reading = self.reading.is_set()
+        super().close()
+
+
+class FakeS3Client:
+    body_class: type[FakeBody] = FakeBody
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.requests: list[dict[str, Any]] = []
+        self.bodies: list[FakeBody] = []
+
+    def get_object(self, **params: Any) -> dict[str, Any]:
+        self.requests.append(params)
+        data = self.data
+        if "Range" in params:
+            first, last = params["Range"].removeprefix("bytes=").split("-")
+            data = data[int(first) : int(last) + 1 if last else None]
+        self.bodies.append(self.body_class(data))
+        return {"Body": self.bodies[-1]}
+
+
+@pytest.mark.asyncio
+async def test_file_stream() -> None:
+    data = bytes(range(256)) * 40
+    backend = _backend(chunk_size=1000, read_ahead=2)
+    client = FakeS3Client(data)
+    backend.s3_client = client
+
+    chunks = [chunk async for chunk in backend.get_file_stream("s3://goosebit/update.swu")]
+    assert b"".join(chunks) == data
+    assert max(len(chunk) for chunk in chunks) == 1000
+    assert client.requests[-1] == {"Bucket": "goosebit", "Key": "update.swu"}
+
+    chunks = [chunk async for chunk in backend.get_file_stream("s3://goosebit/update.swu", 100, 2100)]
+    assert b"".join(chunks) == data[100:2100]
+    assert client.requests[-1]["Range"] == "bytes=100-2099"
+    assert client.bodies[-1].closed
+
+
+@pytest.mark.asyncio
+async def test_file_stream_aborted() -> None:
+    backend = _backend(chunk_size=10, read_ahead=1)
+    client = FakeS3Client(b"x" * 1000)
+    backend.s3_client = client
+
+    stream = backend.get_file_stream("s3://goosebit/update.swu")
+    assert await anext(stream) == b"x" * 10  # type: ignore[call-overload]
+    await stream.aclose()  # type: ignore[attr-defined]
+    assert client.bodies[-1].closed
+
+    FakeBody.fail = True
+    try:
+        with pytest.raises(ConnectionError):
+            [chunk async for chunk in backend.get_file_stream("s3://goosebit/update.swu")]
+    finally:
+        FakeBody.fail = False
+
+
+@pytest.mark.asyncio
+async def test_file_stream_aborted_during_read(monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = _backend(chunk_size=10, read_ahead=1)
+    client = FakeS3Client(b"x" * 1000)
+    monkeypatch.setattr(client, "body_class", SlowBody)
+    backend.s3_client = client
+
+    stream = backend.get_file_stream("s3://goosebit/update.swu")
+    assert await anext(stream) == b"x" * 10  # type: ignore[call-overload]
+    body = client.bodies[-1]
+    assert isinstance(body, SlowBody)
+    while not body.reading.is_set():
+        await asyncio.sleep(0.01)
+
+    # the read in progress finishes before the body is closed
+    threading.Timer(0.1, body.release.set).start()
+    await stream.aclose()  # type: ignore[attr-defined]
+    assert body.closed
+    assert not body.closed_while_reading
+
+
+@pytest.mark.asyncio
+async def test_close() -> None:
+    backend = _backend()
+    backend.s3_client = FakeS3Client(b"x" * 10)
+
+    backend.close()
+    with pytest.raises(RuntimeError):
+        [chunk async for chunk in backend.get_file_stream("s3://goosebit/update.swu")]
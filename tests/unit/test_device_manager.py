@@ -0,0 +1,324 @@
+import asyncio
+import time
+from typing import Any, cast
+
+import pytest
+from httpx import AsyncClient
+
+from goosebit.cache import jittered_ttl, local_cache
+from goosebit.db.models import (
+    Device,
+    DeviceLog,
+    Rollout,
+    Software,
+    UpdateModeEnum,
+    UpdateStateEnum,
+)
+from goosebit.device_manager import (
+    DeviceManager,
+    device_cache,
+    device_logs,
+    heartbeats,
+    rollout_index,
+    running_updates,
+    software_index,
+    warm_up_caches,
+)
+from goosebit.settings import config
+
+
+@pytest.mark.asyncio
+async def test_heartbeats_are_buffered(async_client: AsyncClient, test_data: dict[str, Any]) -> None:
+    device = test_data["device_rollout"]
+
+    response = await async_client.get(f"/DEFAULT/controller/v1/{device.id}")
+    assert response.status_code == 200
+
+    # not written yet, but visible through the buffer
+    device_db = await Device.get(id=device.id)
+    assert device_db.last_seen is None
+
+    response = await async_client.get("/ui/bff/devices?order[0][dir]=asc&order[0][name]=id")
+    assert response.status_code == 200
+    device_api = response.json()["data"][0]
+    assert device_api["id"] == device.id
+    assert device_api["last_seen"] is not None
+    assert device_api["polling"]
+    assert device_api["last_ip"] == "127.0.0.1"
+
+    await heartbeats.flush()
+
+    device_db = await Device.get(id=device.id)
+    assert device_db.last_seen is not None
+    assert device_db.last_ip == "127.0.0.1"
+    assert heartbeats.get(device.id) is None
+
+    # cached device reflects the flushed heartbeat
+    response = await async_client.get(f"/api/v1/devices/{device.id}")
+    assert response.status_code == 200
+    assert response.json()["last_seen"] is not None
+    assert response.json()["polling"]
+    assert response.json()["last_ip"] == "127.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_heartbeats_coalesce_per_device(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.heartbeat, "batch_size", 1)
+    device_rollout = test_data["device_rollout"]
+    device_assigned = test_data["device_assigned"]
+
+    await DeviceManager.update_last_connection(device_rollout, 100, "192.168.0.1")
+    await DeviceManager.update_last_connection(device_rollout, 200, "fe80::1")
+    await DeviceManager.update_last_connection(device_assigned, 300)
+
+    await heartbeats.flush()
+
+    device_db = await Device.get(id=device_rollout.id)
+    assert device_db.last_seen == 200
+    assert device_db.last_ip is None
+    assert device_db.last_ipv6 == "fe80::1"
+
+    device_db = await Device.get(id=device_assigned.id)
+    assert device_db.last_seen == 300
+    assert device_db.last_ip is None
+
+
+@pytest.mark.asyncio
+async def test_running_updates_counter(test_data: dict[str, Any]) -> None:
+    device_rollout = test_data["device_rollout"]
+    device_assigned = test_data["device_assigned"]
+
+    assert await running_updates.get() == 0
+
+    await DeviceManager.update_device_state(device_rollout, UpdateStateEnum.RUNNING)
+    await DeviceManager.update_device_state(device_assigned, UpdateStateEnum.RUNNING)
+    await DeviceManager.update_device_state(device_assigned, UpdateStateEnum.RUNNING)
+    assert await running_updates.get() == 2
+
+    await DeviceManager.update_device_state(device_assigned, UpdateStateEnum.FINISHED)
+    assert await running_updates.get() == 1
+
+    # changes outside of the device manager are picked up on reconciliation
+    await Device.filter(id=device_rollout.id).update(last_state=UpdateStateEnum.ERROR)
+    assert await running_updates.get() == 1
+    assert await running_updates.reconcile() == 0
+    assert await running_updates.get() == 0
+
+
+@pytest.mark.asyncio
+async def test_max_concurrent_updates(async_client: AsyncClient, test_data: dict[str, Any], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "max_concurrent_updates", 1)
+    device_rollout = test_data["device_rollout"]
+    device_assigned = test_data["device_assigned"]
+
+    await DeviceManager.update_device_state(device_assigned, UpdateStateEnum.RUNNING)
+
+    response = await async_client.get(f"/DEFAULT/controller/v1/{device_rollout.id}")
+    assert response.status_code == 200
+    assert response.json()["_links"] == {}
+
+    await DeviceManager.update_device_state(device_assigned, UpdateStateEnum.FINISHED)
+
+    response = await async_client.get(f"/DEFAULT/controller/v1/{device_rollout.id}")
+    assert response.status_code == 200
+    assert "deploymentBase" in response.json()["_links"]
+
+
+@pytest.mark.asyncio
+async def test_rollout_index(test_data: dict[str, Any]) -> None:
+    device = test_data["device_rollout"]
+    hardware = test_data["hardware"]
+    software_release = test_data["software_release"]
+    software_rc = test_data["software_rc"]
+
+    rollout = await DeviceManager.get_rollout(device)
+    assert rollout is not None
+    assert rollout.software.id == software_release.id
+    assert await rollout_index.get(hardware.id, "qa") is None
+
+    # not visible until the index is invalidated
+    rollout_rc = await Rollout.create(software_id=software_rc.id)
+    rollout = await DeviceManager.get_rollout(device)
+    assert rollout is not None
+    assert rollout.software.id == software_release.id
+
+    await rollout_index.invalidate()
+    rollout = await DeviceManager.get_rollout(device)
+    assert rollout is not None
+    assert rollout.id == rollout_rc.id
+
+    await Rollout.filter(id=rollout_rc.id).update(paused=True)
+    await rollout_index.invalidate()
+    rollout = await DeviceManager.get_rollout(device)
+    assert rollout is not None
+    assert rollout.software.id == software_release.id
+
+
+@pytest.mark.asyncio
+async def test_software_index(test_data: dict[str, Any]) -> None:
+    hardware = test_data["hardware"]
+    software_release = test_data["software_release"]
+
+    compatible = await software_index.get(hardware.id)
+    assert [s.id for s in compatible] == [
+        software_release.id,
+        test_data["software_rc"].id,
+        test_data["software_beta"].id,
+    ]
+
+    software_new = await Software.create(version="2.0.0", hash="dummy3", size=800, uri=software_release.uri)
+    await software_new.compatibility.add(hardware)
+    assert (await software_index.latest(hardware.id)).id == software_release.id  # type: ignore[union-attr]
+
+    await DeviceManager.notify_software_changed()
+    assert (await software_index.latest(hardware.id)).id == software_new.id  # type: ignore[union-attr]
+    assert await software_index.latest(-1) is None
+
+
+@pytest.mark.asyncio
+async def test_resolved_updates(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    device = test_data["device_rollout"]
+    software_release = test_data["software_release"]
+    software_rc = test_data["software_rc"]
+
+    resolve_calls = 0
+    resolve_update = DeviceManager._resolve_update
+
+    async def _resolve_update(*args: Any) -> Any:
+        nonlocal resolve_calls
+        resolve_calls += 1
+        return await resolve_update(*args)
+
+    monkeypatch.setattr(DeviceManager, "_resolve_update", _resolve_update)
+
+    for _ in range(5):
+        _, software = await DeviceManager.get_update(device)
+        assert software is not None
+        assert software.id == software_release.id
+    assert resolve_calls == 1
+
+    # a device change resolves again
+    await DeviceManager.update_update(device, UpdateModeEnum.ASSIGNED, software_rc)
+    _, software = await DeviceManager.get_update(device)
+    assert software is not None
+    assert software.id == software_rc.id
+    assert resolve_calls == 2
+
+    # so does a software change
+    await DeviceManager.notify_software_changed()
+    await DeviceManager.get_update(device)
+    assert resolve_calls == 3
+
+
+@pytest.mark.asyncio
+async def test_device_log_segments(async_client: AsyncClient, test_data: dict[str, Any]) -> None:
+    device = test_data["device_rollout"]
+
+    await DeviceManager.deployment_action_start(device)
+    for i in range(5):
+        await DeviceManager.update_log(device, f"line {i}")
+
+    assert await DeviceManager.get_log(device) == ("".join(f"line {i}\n" for i in range(5)), None)
+
+    response = await async_client.get(f"/api/v1/devices/{device.id}/log?limit=2")
+    assert response.status_code == 200
+    page = response.json()
+    assert page["log"] == "line 0\nline 1\n"
+
+    response = await async_client.get(f"/api/v1/devices/{device.id}/log?limit=2&after={page['next']}")
+    page = response.json()
+    assert page["log"] == "line 2\nline 3\n"
+
+    response = await async_client.get(f"/api/v1/devices/{device.id}/log?limit=2&after={page['next']}")
+    page = response.json()
+    assert page["log"] == "line 4\n"
+    assert page["next"] is None
+
+    # a new deployment starts with an empty log
+    await DeviceManager.deployment_action_start(device)
+    assert await DeviceManager.get_log(device) == (None, None)
+
+    await DeviceManager.delete_devices([device.id])
+    assert await DeviceLog.filter(device_id=device.id).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_device_log_retention(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.device_log, "max_deployments", 2)
+    monkeypatch.setattr(config.device_log, "max_bytes", 40)
+    device = test_data["device_rollout"]
+
+    for deployment in range(3):
+        await DeviceManager.deployment_action_start(device)
+        await DeviceManager.update_log(device, f"deployment {deployment}")
+    deployments = cast(list[int], await DeviceLog.filter(device_id=device.id).values_list("deployment", flat=True))
+    assert deployments == [2, 3]
+
+    for i in range(10):
+        await DeviceManager.update_log(device, f"line {i}")
+    sizes = cast(list[int], await DeviceLog.filter(device_id=device.id).values_list("size", flat=True))
+    assert sum(sizes) <= 40
+    log, _ = await DeviceManager.get_log(device)
+    assert log is not None
+    assert log.endswith("line 9\n")
+
+    await device_logs.append(device, "x" * 100)
+    log, _ = await DeviceManager.get_log(device)
+    assert log == "x" * 40
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cache_fills_are_coalesced(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    calls = 0
+    get_or_create = Device.get_or_create
+
+    async def _get_or_create(*args: Any, **kwargs: Any) -> Any:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return await get_or_create(*args, **kwargs)
+
+    monkeypatch.setattr(Device, "get_or_create", _get_or_create)
+
+    devices = await asyncio.gather(*[DeviceManager.get_device("reconnecting") for _ in range(10)])
+    assert calls == 1
+    assert all(device.id == "reconnecting" for device in devices)
+    # every request gets its own instance, as when read from the cache
+    assert len({id(device) for device in devices}) == 10
+
+    await DeviceManager.get_device("reconnecting")
+    assert calls == 1
+
+
+def test_jittered_ttl(monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.cache, "ttl", 600)
+    monkeypatch.setattr(config.cache, "ttl_jitter", 0.1)
+    ttls = {jittered_ttl() for _ in range(100)}
+    assert all(540 <= ttl <= 660 for ttl in ttls)
+    assert len(ttls) > 1
+
+    monkeypatch.setattr(config.cache, "ttl_jitter", 0)
+    assert jittered_ttl() == 600
+
+
+@pytest.mark.asyncio
+async def test_warm_up_caches(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.cache.warmup, "batch_size", 1)
+    active = [test_data["device_rollout"], test_data["device_assigned"]]
+    for device in active:
+        device.last_seen = round(time.time())
+        await device.save(update_fields=["last_seen"])
+    inactive = await Device.create(
+        id="inactive",
+        hardware=test_data["hardware"],
+        last_seen=round(time.time()) - config.cache.warmup.active_within - 10,
+    )
+
+    assert await warm_up_caches() == 2
+    for device in active:
+        assert await device_cache.get(device.id) is not None
+    assert await device_cache.get(inactive.id) is None
+
+    local_cache.clear()
+    monkeypatch.setattr(config.cache.warmup, "max_devices", 1)
+    assert await warm_up_caches() == 1
@@ -4,6 +4,7 @@ import pytest
 from httpx import AsyncClient
 
 from goosebit.db.models import Device
+from goosebit.device_manager import DeviceManager
 from goosebit.settings import config
 from goosebit.settings.schema import DeviceAuthMode
 
@@ -173,3 +174,77 @@ async def test_poll_setup_with_no_auth_no_change(
 
     device_api = await _api_device_get(async_client, device.id)
     assert device_api["auth_token"] == device.auth_token
+
+
+@pytest.mark.asyncio
+async def test_poll_strict_without_database_lookups(
+    async_client: AsyncClient, test_data: Dict[str, Any], monkeypatch: Any
+) -> None:
+    device = test_data["device_authentication"]
+    monkeypatch.setattr(config.device_auth, "enable", True)
+    monkeypatch.setattr(config.device_auth, "mode", DeviceAuthMode.STRICT)
+
+    lookups = 0
+    get_or_none = Device.get_or_none
+
+    def _get_or_none(*args: Any, **kwargs: Any) -> Any:
+        nonlocal lookups
+        lookups += 1
+        return get_or_none(*args, **kwargs)
+
+    monkeypatch.setattr(Device, "get_or_none", _get_or_none)
+
+    for _ in range(3):
+        response = await async_client.get(
+            f"/DEFAULT/controller/v1/{device.id}", headers={"Authorization": f"TargetToken {device.auth_token}"}
+        )
+        assert response.status_code == 200
+
+        # unknown devices are remembered as well
+        response = await async_client.get("/DEFAULT/controller/v1/unknown", headers={"Authorization": "TargetToken x"})
+        assert response.status_code == 401
+
+    assert lookups == 2
+
+
+@pytest.mark.asyncio
+async def test_poll_strict_registered_after_unknown(
+    async_client: AsyncClient, test_data: Dict[str, Any], monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(config.device_auth, "enable", True)
+    monkeypatch.setattr(config.device_auth, "mode", DeviceAuthMode.STRICT)
+
+    response = await async_client.get("/DEFAULT/controller/v1/new", headers={"Authorization": "TargetToken token"})
+    assert response.status_code == 401
+
+    response = await async_client.put("/api/v1/devices", json={"devices": ["new"], "auth_token": "token"})
+    assert response.status_code == 200
+
+    response = await async_client.get("/DEFAULT/controller/v1/new", headers={"Authorization": "TargetToken token"})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_poll_setup_writes_token_on_change(
+    async_client: AsyncClient, test_data: Dict[str, Any], monkeypatch: Any
+) -> None:
+    device = test_data["device_authentication"]
+    monkeypatch.setattr(config.device_auth, "enable", True)
+    monkeypatch.setattr(config.device_auth, "mode", DeviceAuthMode.SETUP)
+
+    saved_fields: list[list[str]] = []
+    save_device = DeviceManager.save_device
+
+    async def _save_device(device: Device, update_fields: list[str]) -> None:
+        saved_fields.append(update_fields)
+        await save_device(device, update_fields)
+
+    monkeypatch.setattr(DeviceManager, "save_device", _save_device)
+
+    for token in [device.auth_token, device.auth_token, "changed", "changed"]:
+        response = await async_client.get(
+            f"/DEFAULT/controller/v1/{device.id}", headers={"Authorization": f"TargetToken {token}"}
+        )
+        assert response.status_code == 200
+
+    assert saved_fields.count(["auth_token"]) == 1
@@ -0,0 +1,94 @@
+import json
+from typing import Any
+
+import pytest
+from fastapi.requests import Request
+
+from goosebit import app
+from goosebit.device_manager import HandlingType
+from goosebit.updater.controller.v1.payloads import (
+    chunk_templates,
+    deployment_payload,
+    link_templates,
+    software_chunks,
+)
+from goosebit.updates import generate_chunk
+
+
+def _request(host: str = "test") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "app": app,
+            "router": app.router,
+            "scheme": "http",
+            "server": ("test", 80),
+            "path": "/",
+            "root_path": "",
+            "headers": [(b"host", host.encode())],
+            "query_string": b"",
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_link_templates() -> None:
+    request = _request()
+
+    assert link_templates.url(request, "config_data", "device1") == str(
+        request.url_for("config_data", dev_id="device1")
+    )
+    assert link_templates.url(request, "deployment_base", "device1", action_id=5) == str(
+        request.url_for("deployment_base", dev_id="device1", action_id=5)
+    )
+
+
+@pytest.mark.asyncio
+async def test_templates_independent_of_host(test_data: dict[str, Any]) -> None:
+    software = test_data["software_release"]
+    link_templates.clear()
+
+    for i in range(50):
+        request = _request(f"host{i}")
+        assert link_templates.url(request, "config_data", "device1") == str(
+            request.url_for("config_data", dev_id="device1")
+        )
+        assert json.loads(software_chunks(request, software, "device1"))[0]["artifacts"][0]["_links"]["download"][
+            "href"
+        ] == str(request.url_for("download_artifact", dev_id="device1"))
+
+    # the client controlled Host header does not add entries
+    assert len(link_templates._templates) == 2
+    assert len(chunk_templates._templates) == 1
+
+
+@pytest.mark.asyncio
+async def test_deployment_payload_matches_chunk(test_data: dict[str, Any]) -> None:
+    request = _request()
+    device = test_data["device_rollout"]
+    software = test_data["software_release"]
+    device.id = 'device"1'
+
+    chunks = software_chunks(request, software, device.id)
+    assert json.loads(chunks) == [chunk.model_dump(by_alias=True) for chunk in await generate_chunk(request, device)]
+
+    # served from the template for other devices
+    assert json.loads(software_chunks(request, software, "device2"))[0]["artifacts"][0]["_links"]["download"][
+        "href"
+    ] == str(request.url_for("download_artifact", dev_id="device2"))
+
+    response = deployment_payload(software.id, HandlingType.FORCED, chunks)
+    assert json.loads(bytes(response.body)) == {
+        "id": str(software.id),
+        "deployment": {"download": "forced", "update": "forced", "chunks": json.loads(chunks)},
+    }
+
+
+@pytest.mark.asyncio
+async def test_deployment_remote_software(test_data: dict[str, Any]) -> None:
+    device = test_data["device_rollout"]
+    software = test_data["software_release"]
+    software.uri = "https://example.com/software.swu"
+
+    chunks = json.loads(software_chunks(_request(), software, device.id))
+    assert chunks[0]["artifacts"][0]["_links"]["download"]["href"] == software.uri
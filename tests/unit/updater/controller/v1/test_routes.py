@@ -275,8 +275,8 @@ async def test_latest_with_no_software_available(async_client: AsyncClient, test
     await _api_device_update(async_client, device, "software", "latest")
 
     fake_hardware = await Hardware.create(model="does-not-exist", revision="default")
-    device.hardware_id = fake_hardware.id
-    await device.save()
+    device = await get_device(dev_id=device.id)
+    await DeviceManager.update_hardware(device, fake_hardware)
 
     await _poll(async_client, device.id, None, False)
 
@@ -0,0 +1,58 @@
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+
+import goosebit.updater.context
+from goosebit.settings import config
+from goosebit.settings.schema import DeviceAuthMode
+
+
+class _Histogram:
+    def __init__(self) -> None:
+        self.values: list[int] = []
+
+    def record(self, value: int) -> None:
+        self.values.append(value)
+
+
+@pytest.mark.parametrize("mode", [None, DeviceAuthMode.SETUP, DeviceAuthMode.LAX, DeviceAuthMode.STRICT])
+@pytest.mark.asyncio
+async def test_single_device_lookup_per_request(
+    async_client: AsyncClient, test_data: dict[str, Any], monkeypatch: Any, mode: DeviceAuthMode | None
+) -> None:
+    device = test_data["device_authentication"]
+    if mode is not None:
+        monkeypatch.setattr(config.device_auth, "enable", True)
+        monkeypatch.setattr(config.device_auth, "mode", mode)
+    lookups = _Histogram()
+    monkeypatch.setattr(goosebit.updater.context, "device_lookups", lookups)
+
+    response = await async_client.get(
+        f"/DEFAULT/controller/v1/{device.id}", headers={"Authorization": f"TargetToken {device.auth_token}"}
+    )
+    assert response.status_code == 200
+
+    response = await async_client.get(
+        f"/DEFAULT/controller/v1/{device.id}/deploymentBase/1",
+        headers={"Authorization": f"TargetToken {device.auth_token}"},
+    )
+    assert response.status_code == 200
+
+    assert lookups.values == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_device_registration_lookups(
+    async_client: AsyncClient, test_data: dict[str, Any], monkeypatch: Any
+) -> None:
+    lookups = _Histogram()
+    monkeypatch.setattr(goosebit.updater.context, "device_lookups", lookups)
+
+    response = await async_client.get("/DEFAULT/controller/v1/new-device")
+    assert response.status_code == 200
+    response = await async_client.get("/DEFAULT/controller/v1/new-device")
+    assert response.status_code == 200
+
+    # looked up and then registered, afterwards found right away
+    assert lookups.values == [2, 1]
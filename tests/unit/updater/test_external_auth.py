@@ -0,0 +1,91 @@
+import asyncio
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from werkzeug import Response
+
+from goosebit.settings import config
+from goosebit.settings.schema import DeviceAuthMode
+from goosebit.updater.external_auth import ExternalAuthUnavailable, external_tokens
+
+
+@pytest_asyncio.fixture
+async def external_auth(httpserver: Any, monkeypatch: Any) -> AsyncGenerator[Any, None]:
+    monkeypatch.setattr(config.device_auth, "enable", True)
+    monkeypatch.setattr(config.device_auth, "mode", DeviceAuthMode.EXTERNAL)
+    monkeypatch.setattr(config.device_auth, "external_url", httpserver.url_for("/auth"))
+    external_tokens.clear()
+    yield httpserver
+    external_tokens.clear()
+    await external_tokens.close()
+
+
+@pytest.mark.asyncio
+async def test_verification_is_cached(async_client: AsyncClient, test_data: dict[str, Any], external_auth: Any) -> None:
+    device = test_data["device_rollout"]
+    external_auth.expect_request("/auth", json={"token": "valid"}).respond_with_data("ok")
+    external_auth.expect_request("/auth", json={"token": "invalid"}).respond_with_data("denied", status=403)
+
+    for _ in range(3):
+        response = await async_client.get(
+            f"/DEFAULT/controller/v1/{device.id}", headers={"Authorization": "TargetToken valid"}
+        )
+        assert response.status_code == 200
+
+        response = await async_client.get(
+            f"/DEFAULT/controller/v1/{device.id}", headers={"Authorization": "TargetToken invalid"}
+        )
+        assert response.status_code == 401
+
+    assert len(external_auth.log) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_verifications_share_request(external_auth: Any) -> None:
+    external_auth.expect_request("/auth").respond_with_data("ok")
+
+    results = await asyncio.gather(*[external_tokens.verify("token") for _ in range(10)])
+
+    assert all(results)
+    assert len(external_auth.log) == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker(external_auth: Any, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.device_auth, "external_failure_threshold", 2)
+    external_auth.expect_request("/auth").respond_with_response(Response("unavailable", status=503))
+
+    for _ in range(4):
+        with pytest.raises(ExternalAuthUnavailable):
+            await external_tokens.verify("token")
+    assert external_tokens.breaker.open
+    assert len(external_auth.log) == 2
+
+    monkeypatch.setattr(config.device_auth, "external_fail_open", True)
+    assert await external_tokens.verify("token")
+
+    # probe the service once the recovery time passed
+    monkeypatch.setattr(config.device_auth, "external_recovery_time", 0)
+    external_auth.clear_all_handlers()
+    external_auth.expect_request("/auth").respond_with_data("denied", status=401)
+    assert not await external_tokens.verify("token")
+    assert not external_tokens.breaker.open
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error(
+    async_client: AsyncClient, test_data: dict[str, Any], external_auth: Any, monkeypatch: Any
+) -> None:
+    async def _request(token: str) -> Any:
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(external_tokens, "_request", _request)
+    device = test_data["device_rollout"]
+
+    response = await async_client.get(
+        f"/DEFAULT/controller/v1/{device.id}", headers={"Authorization": "TargetToken valid"}
+    )
+    assert response.status_code == 401
+    assert external_tokens.breaker.failures == 1
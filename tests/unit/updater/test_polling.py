@@ -0,0 +1,108 @@
+import time
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+
+from goosebit.schema.devices import DeviceSchema
+from goosebit.settings import config
+from goosebit.settings.schema import PollTimeRule
+from goosebit.updater.polling import (
+    format_poll_time,
+    parse_poll_time,
+    poll_time_policy,
+)
+
+
+def test_poll_time_conversion() -> None:
+    assert parse_poll_time("01:02:03") == 3723
+    assert format_poll_time(3723) == "01:02:03"
+    assert format_poll_time(59) == "00:00:59"
+
+
+@pytest.mark.asyncio
+async def test_poll_time_rules(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    device = test_data["device_rollout"]
+
+    assert await poll_time_policy.get(device) == config.poll_time
+
+    monkeypatch.setattr(
+        config.polling,
+        "rules",
+        [
+            PollTimeRule(feed="qa", poll_time="00:00:05"),
+            PollTimeRule(hw_model="other", poll_time="00:00:10"),
+            PollTimeRule(hw_model="default", hw_revision="default", poll_time="00:05:00"),
+            PollTimeRule(poll_time="00:10:00"),
+        ],
+    )
+    assert await poll_time_policy.get(device) == "00:05:00"
+
+    device.feed = "qa"
+    assert await poll_time_policy.get(device) == "00:00:05"
+
+
+@pytest.mark.asyncio
+async def test_poll_time_jitter(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "poll_time", "00:01:40")
+    monkeypatch.setattr(config.polling, "jitter", 0.2)
+    device_rollout = test_data["device_rollout"]
+    device_assigned = test_data["device_assigned"]
+
+    sleep = parse_poll_time(await poll_time_policy.get(device_rollout))
+    assert 80 <= sleep <= 120
+    # stable for a device
+    assert parse_poll_time(await poll_time_policy.get(device_rollout)) == sleep
+    assert parse_poll_time(await poll_time_policy.get(device_assigned)) != sleep
+
+
+@pytest.mark.asyncio
+async def test_poll_time_load(async_client: AsyncClient, test_data: dict[str, Any], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "poll_time", "00:01:00")
+    monkeypatch.setattr(config.polling.load, "running_updates_threshold", 1)
+    monkeypatch.setattr(config.polling.load, "max_factor", 3.0)
+    device = test_data["device_rollout"]
+    load = poll_time_policy.load
+
+    try:
+        load.running_updates = 2
+        load.factor = load.calculate_factor()
+        assert load.factor == 2.0
+
+        response = await async_client.get(f"/DEFAULT/controller/v1/{device.id}")
+        assert response.status_code == 200
+        assert response.json()["config"]["polling"]["sleep"] == "00:02:00"
+
+        load.running_updates = 10
+        assert load.calculate_factor() == 3.0
+
+        await load.sample()
+        assert load.running_updates == 0
+        assert load.factor == 1.0
+    finally:
+        await load.stop()
+
+
+@pytest.mark.asyncio
+async def test_device_polling(test_data: dict[str, Any], monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "poll_time", "00:01:00")
+    monkeypatch.setattr(config.polling, "jitter", 0.5)
+    device = test_data["device_rollout"]
+    await device.fetch_related("hardware", "assigned_software")
+    device.last_seen = time.time() - 300
+
+    assert not DeviceSchema.model_validate(device).polling
+
+    # judged by the poll time handed out to the device
+    monkeypatch.setattr(config.polling, "rules", [PollTimeRule(hw_model="default", poll_time="00:04:00")])
+    schema = DeviceSchema.model_validate(device)
+    assert schema.poll_seconds == 360
+    assert schema.polling
+
+    monkeypatch.setattr(config.polling, "rules", [PollTimeRule(feed="qa", poll_time="00:04:00")])
+    load = poll_time_policy.load
+    try:
+        load.factor = 4.0
+        assert DeviceSchema.model_validate(device).polling
+    finally:
+        load.factor = 1.0
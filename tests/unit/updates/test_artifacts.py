@@ -0,0 +1,79 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from fastapi.requests import Request
+from pytest_httpserver import HTTPServer
+
+from goosebit.db.models import Software
+from goosebit.storage import storage
+from goosebit.updates.artifacts import parse_range, stream_artifact
+
+CONTENT = b"0123456789"
+
+
+@pytest.fixture
+def software(tmp_path: Path) -> Software:
+    path = tmp_path.joinpath("software.swu")
+    path.write_bytes(CONTENT)
+    return Software(version="1", hash="abc", size=len(CONTENT), uri=path.as_uri())
+
+
+def _request(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+        }
+    )
+
+
+async def _body(response: Any) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def test_parse_range(software: Software) -> None:
+    assert parse_range(_request(), software) is None
+    assert parse_range(_request(range="bytes=2-5"), software) == (2, 6)
+    assert parse_range(_request(range="bytes=7-"), software) == (7, 10)
+    assert parse_range(_request(range="bytes=-3"), software) == (7, 10)
+    assert parse_range(_request(range="bytes=5-100"), software) == (5, 10)
+    # malformed or multiple ranges get the whole artifact
+    assert parse_range(_request(range="bytes=5-2"), software) is None
+    assert parse_range(_request(range="bytes=0-1,4-5"), software) is None
+    assert parse_range(_request(range="items=0-1"), software) is None
+
+    assert parse_range(_request(range="bytes=2-5", if_range='"abc"'), software) == (2, 6)
+    assert parse_range(_request(range="bytes=2-5", if_range='"changed"'), software) is None
+
+    with pytest.raises(HTTPException) as e:
+        parse_range(_request(range="bytes=10-"), software)
+    assert e.value.status_code == 416
+    assert e.value.headers == {"Content-Range": "bytes */10"}
+
+
+@pytest.mark.asyncio
+async def test_stream_artifact(software: Software) -> None:
+    response = stream_artifact(_request(), software)
+    assert response.status_code == 200
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["Content-Length"] == "10"
+    assert await _body(response) == CONTENT
+
+    response = stream_artifact(_request(range="bytes=3-"), software)
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 3-9/10"
+    assert response.headers["Content-Length"] == "7"
+    assert await _body(response) == CONTENT[3:]
+
+
+@pytest.mark.asyncio
+async def test_remote_file_stream_range(httpserver: HTTPServer) -> None:
+    # server ignoring the range
+    httpserver.expect_request("/software.swu").respond_with_data(CONTENT)
+
+    chunks = storage.get_file_stream(httpserver.url_for("/software.swu"), 2, 6)
+    assert b"".join([chunk async for chunk in chunks]) == CONTENT[2:6]
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+
+from goosebit.settings import config
+from goosebit.util.passwords import password_hasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify() -> None:
+    hashed_pwd = await password_hasher.hash("secret")
+
+    assert await password_hasher.verify(hashed_pwd, "secret")
+    assert not await password_hasher.verify(hashed_pwd, "wrong")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_operations() -> None:
+    hashed = await asyncio.gather(*[password_hasher.hash(f"secret{i}") for i in range(4)])
+
+    assert all(await asyncio.gather(*[password_hasher.verify(h, f"secret{i}") for i, h in enumerate(hashed)]))
+    assert password_hasher._pending == 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_when_queue_full(async_client: AsyncClient, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config.password_hashing, "max_queue", 0)
+
+    with pytest.raises(HTTPException) as e:
+        await password_hasher.hash("secret")
+    assert e.value.status_code == 503
+
+    response = await async_client.post("/login", data={"username": "testing@goosebit.test", "password": "test"})
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_login_wrong_password(async_client: AsyncClient) -> None:
+    response = await async_client.post("/login", data={"username": "testing@goosebit.test", "password": "wrong"})
+    assert response.status_code == 401